@@ -0,0 +1,15 @@
+#
+# Benchmarks for hp35. Each module runs on its own, e.g.
+#
+#   python -m benchmarks.suite --check
+#   python benchmarks/startup.py
+#
+import timeit
+
+
+def per_call(case, number, namespace=None, repeat=5):
+    #
+    # Best of repeat, in nanoseconds per call. case is a function, or a
+    # statement to run in namespace.
+    #
+    return min(timeit.repeat(case, globals=namespace, number=number, repeat=repeat)) / number * 1e9
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Per-key dispatch cost: the if/elif chain process_action_keys() used to run
+# every key through, against the table-driven execute_key(), and the old
+# linear scan of the key list in get_cmd() against a dictionary lookup.
+# The registers are reset to the same values before every key, and the cost
+# of doing that alone is subtracted so only dispatch plus the op is left.
+#
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+from benchmarks import per_call  # noqa: E402
+import hp35data as hpdata  # noqa: E402
+
+key_list = ['off', 'on',
+            'xy', 'log', 'ln', 'ex', 'clr',
+            'rx', 'as', 'ac', 'at', 'sin', 'cos', 'tan',
+            '1x', 'rv', 'rd', 'sto', 'rcl',
+            'e', 'chs', 'eex', 'clx',
+            '-', '7', '8', '9',
+            '+', '4', '5', '6',
+            'x', '1', '2', '3',
+            '/', '0', '.', 'pi', ]
+
+
+def chain_execute_key(cmd, stack):
+    # The if/elif chain as it was, for comparison
+    wink = False
+    if cmd == 'clr':
+        stack.clear()
+    elif cmd == 'e':
+        stack.lift()
+    elif cmd == 'rd':
+        stack.roll()
+    elif cmd == 'rv':
+        stack.swap()
+    elif cmd == 'sto':
+        stack.store()
+    elif cmd == 'rcl':
+        stack.recall()
+    elif cmd == 'clx':
+        stack.X = float(0.0)
+    elif cmd == 'chs':
+        temp = float(stack.X)
+        stack.X = temp * -1.0
+    elif cmd == '+':
+        hp35.add(stack)
+    elif cmd == '-':
+        hp35.subtract(stack)
+    elif cmd == 'x':
+        wink = hp35.multiply(stack)
+    elif cmd == '/':
+        wink = hp35.divide(stack)
+    elif cmd == '1x':
+        wink = hp35.reciprocal(stack)
+    elif cmd == 'rx':
+        wink = hp35.square_root(stack)
+    elif cmd == 'log':
+        wink = hp35.log(stack)
+    elif cmd == 'ln':
+        wink = hp35.ln(stack)
+    elif cmd == 'sin':
+        hp35.sin(stack)
+    elif cmd == 'as':
+        wink = hp35.arcsin(stack)
+    elif cmd == 'cos':
+        hp35.cos(stack)
+    elif cmd == 'ac':
+        wink = hp35.arccos(stack)
+    elif cmd == 'tan':
+        hp35.tan(stack)
+    elif cmd == 'at':
+        hp35.arctan(stack)
+    elif cmd == 'xy':
+        wink = hp35.exp(stack)
+    elif cmd == 'ex':
+        wink = hp35.ex(stack)
+    return wink
+
+
+def main():
+    my_parser = argparse.ArgumentParser(prog="dispatch", description='Time per-key dispatch.')
+    my_parser.add_argument('-n', '--number', type=int, default=100000, help='calls per timing, default is 100000')
+    args = my_parser.parse_args()
+    stack = hp35.Registers(0.5, 2.0, 3.0, 4.0, 5.0)
+    namespace = {'hp35': hp35, 'hpdata': hpdata, 'key_list': key_list, 'chain': chain_execute_key,
+                 'stack': stack}
+    reset = 'stack.X = 0.5; stack.Y = 2.0'
+    overhead = per_call(reset, args.number, namespace)
+    print('{:<6}{:>12}{:>12}{:>12}{:>12}'.format('key', 'chain ns', 'table ns', 'list in ns', 'dict in ns'))
+    for key, spec in hpdata.key_table.items():
+        if not spec.handler:
+            continue
+        namespace['key'] = key
+        chain = per_call(reset + '; chain(key, stack)', args.number, namespace) - overhead
+        table = per_call(reset + '; hp35.execute_key(key, stack)', args.number, namespace) - overhead
+        scan = per_call('key in key_list', args.number, namespace)
+        lookup = per_call('key in hpdata.key_table', args.number, namespace)
+        print('{:<6}{:>12.1f}{:>12.1f}{:>12.1f}{:>12.1f}'.format(key, chain, table, scan, lookup))
+
+
+if __name__ == "__main__":
+    main()
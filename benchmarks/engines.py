@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# The float engine in hp35.py against the decimal one in hp35bcd: the cost
+# of each op and of formatting the LED display in each, then a divergence
+# report from running the same random keystroke programs through both and
+# comparing what the display shows at the end.
+#
+import argparse
+import collections
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+from benchmarks import per_call  # noqa: E402
+import hp35bcd  # noqa: E402
+
+#
+# name: (key, X, Y)
+#
+ops = {'add': ('+', 1.5, 2.25),
+       'subtract': ('-', 1.5, 2.25),
+       'multiply': ('x', 1.5, 2.25),
+       'divide': ('/', 3.0, 2.0),
+       'reciprocal': ('1x', 3.0, 0.0),
+       'square_root': ('rx', 2.0, 0.0),
+       'log': ('log', 2.0, 0.0),
+       'ln': ('ln', 2.0, 0.0),
+       'sin': ('sin', 30.0, 0.0),
+       'arctan': ('at', 1.0, 0.0),
+       'exp': ('ex', 2.0, 0.0),
+       'x^y': ('xy', 2.0, 10.0)}
+
+numbers = {'in range': 1234.5678,
+           'fraction': 0.333333333,
+           'big': 4.562389e+16,
+           'small': -1.0045e-25}
+
+# Keys for the random programs, weighted towards the arithmetic
+program_keys = ['+', '-', 'x', '/'] * 4 + ['1x', 'rx', 'log', 'ln', 'sin', 'cos', 'tan', 'as', 'ac', 'at', 'ex',
+                                           'xy', 'e', 'rv', 'rd', 'chs']
+
+
+def op_case(engine, key, x, y):
+    handler = engine.dispatch[key]
+    x = engine.entry_value(x)
+    y = engine.entry_value(y)
+    stack = engine.registers()
+
+    def case():
+        stack.X = x
+        stack.Y = y
+        handler(stack)
+    return case
+
+
+def random_program(rng, length):
+    tokens = []
+    for _ in range(length):
+        if rng.random() < 0.3:
+            tokens.append(repr(round(rng.uniform(-100.0, 100.0), rng.randint(0, 6))))
+        else:
+            tokens.append(rng.choice(program_keys))
+    return tokens
+
+
+def first_difference(tokens, bcd):
+    #
+    # The step at which the two engines first show different displays
+    #
+    float_stack = hp35.float_engine.registers()
+    bcd_stack = bcd.registers()
+    for step, key in enumerate(tokens):
+        hp35.replay_keys([key], float_stack)
+        hp35.replay_keys([key], bcd_stack, bcd)
+        if hp35.led_string(float_stack.X) != bcd.led_string(bcd_stack.X):
+            return step
+    return None
+
+
+def divergence(programs, length, seed, examples):
+    rng = random.Random(seed)
+    bcd = hp35.get_engine('bcd')
+    by_key = collections.Counter()
+    shown = []
+    differ = 0
+    errors = 0
+    for _ in range(programs):
+        tokens = random_program(rng, length)
+        float_stack = hp35.float_engine.registers()
+        bcd_stack = bcd.registers()
+        try:
+            hp35.replay_keys(tokens, float_stack)
+            hp35.replay_keys(tokens, bcd_stack, bcd)
+        except ValueError:
+            # 0 to a negative power raises in both engines
+            errors += 1
+            continue
+        float_led = hp35.led_string(float_stack.X)
+        bcd_led = bcd.led_string(bcd_stack.X)
+        if float_led == bcd_led:
+            continue
+        differ += 1
+        step = first_difference(tokens, bcd)
+        by_key[tokens[step] if step is not None else '?'] += 1
+        if len(shown) < examples:
+            shown.append((' '.join(tokens), float_led, bcd_led))
+    print()
+    print('{} of {} programs of {} keys end with a different display ({:.1%})'.format(
+        differ, programs, length, differ / programs))
+    if errors:
+        print(errors, 'programs raised an error and were left out')
+    if by_key:
+        print()
+        print('{:<10}{:>8}'.format('first key', 'count'))
+        for key, count in by_key.most_common():
+            print('{:<10}{:>8}'.format(key, count))
+    for keys, float_led, bcd_led in shown:
+        print()
+        print(keys)
+        print('  float [' + float_led + ']')
+        print('  bcd   [' + bcd_led + ']')
+
+
+def main():
+    my_parser = argparse.ArgumentParser(prog="engines", description='Compare the float and bcd engines.')
+    my_parser.add_argument('-n', '--number', type=int, default=20000, help='calls per timing, default is 20000')
+    my_parser.add_argument('--programs', type=int, default=10000,
+                           help='random programs for the divergence report, default is 10000')
+    my_parser.add_argument('--length', type=int, default=12, help='keys per random program, default is 12')
+    my_parser.add_argument('--seed', type=int, default=35, help='random seed, default is 35')
+    my_parser.add_argument('--examples', type=int, default=5, help='differing programs to show, default is 5')
+    args = my_parser.parse_args()
+    engines = (hp35.float_engine, hp35bcd.engine)
+    print('{:<28}{:>12}{:>12}'.format('', 'float ns', 'bcd ns'))
+    for name, (key, x, y) in ops.items():
+        times = [per_call(op_case(engine, key, x, y), args.number) for engine in engines]
+        print('{:<28}{:>12.1f}{:>12.1f}'.format('op ' + name, *times))
+    for name, value in numbers.items():
+        times = [per_call(lambda e=engine, v=engine.entry_value(value): e.led_string(v), args.number)
+                 for engine in engines]
+        print('{:<28}{:>12.1f}{:>12.1f}'.format('led_string ' + name, *times))
+    # led_string caches, format_led is the uncached float path
+    for name, value in numbers.items():
+        print('{:<28}{:>12.1f}'.format('format_led ' + name,
+                                       per_call(lambda v=value: hp35.format_led(v), args.number)))
+    divergence(args.programs, args.length, args.seed, args.examples)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
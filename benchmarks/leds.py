@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35vec.format_led() against hp35.format_led() called once per value, on
+# arrays of the kinds of number the display sees: engine results (rounded to
+# 9 places), numbers in scientific notation, and raw floats with all their
+# digits. Each array is also checked to come out exactly the same both ways.
+#
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+import hp35vec  # noqa: E402
+
+
+def arrays(size, seed):
+    generator = np.random.default_rng(seed)
+    signs = generator.choice([-1.0, 1.0], size)
+    yield 'engine results', np.round(generator.uniform(-1000.0, 1000.0, size), 9)
+    yield 'scientific', signs * 10.0 ** generator.uniform(-99.0, 99.0, size)
+    yield 'raw floats', signs * 10.0 ** generator.uniform(-3.0, 9.0, size)
+
+
+def best_of(function, repeat):
+    times = []
+    for run in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    my_parser = argparse.ArgumentParser(prog="leds", description='Time LED formatting of whole arrays.')
+    my_parser.add_argument('-n', '--size', type=int, default=1000000, help='values in each array, default is 1000000')
+    my_parser.add_argument('--repeat', type=int, default=3, help='runs of each, best is shown, default is 3')
+    my_parser.add_argument('--seed', type=int, default=35)
+    args = my_parser.parse_args()
+    print('{:<16}{:>12}{:>12}{:>10}'.format('values', 'per value', 'array', 'speedup'))
+    for name, values in arrays(args.size, args.seed):
+        numbers = values.tolist()
+        if list(hp35vec.format_led(values)) != [hp35.format_led(number) for number in numbers]:
+            print(name + ': the two give different strings')
+            sys.exit(1)
+        one_by_one = best_of(lambda: [hp35.format_led(number) for number in numbers], args.repeat)
+        array = best_of(lambda: hp35vec.format_led(values), args.repeat)
+        print('{:<16}{:>10.3f} s{:>10.3f} s{:>9.1f}x'.format(name, one_by_one, array, one_by_one / array))
+
+
+if __name__ == "__main__":
+    main()
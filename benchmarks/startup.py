@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Cold-start benchmark for hp35. Each case is run in a fresh interpreter,
+# since that's how hp35 gets used from other scripts, and the median wall
+# time is reported along with the import cost of hp35 itself as measured by
+# 'python -X importtime'.
+#
+# Use --save to record the numbers for the current version in startup.json,
+# so cold-start time can be tracked from one release to the next.
+#
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS = os.path.join(HERE, 'startup.json')
+HP35 = os.path.join(ROOT, 'hp35.py')
+
+cases = {'import': [sys.executable, '-c', 'import hp35'],
+         'version': [sys.executable, HP35, '--version'],
+         'keys': [sys.executable, HP35, '--keys', '2 rx 3 xy']}
+
+
+def time_command(command, runs):
+    times = []
+    for run in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(times)
+
+
+def import_time(runs):
+    #
+    # -X importtime writes 'import time: self | cumulative | name' lines to
+    # stderr. The cumulative figure on the hp35 line covers everything it pulls in.
+    #
+    times = []
+    for run in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import hp35'], cwd=ROOT,
+                                stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == 'hp35':
+                times.append(int(fields[1]) / 1000.0)
+    return statistics.median(times)
+
+
+def load_results():
+    try:
+        with open(RESULTS) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    my_parser = argparse.ArgumentParser(prog="startup", description='Time cold starts of hp35.')
+    my_parser.add_argument('-n', '--runs', type=int, default=20, help='runs per case, default is 20')
+    my_parser.add_argument('--save', action='store_true',
+                           help='record the results for this version in startup.json')
+    args = my_parser.parse_args()
+    sys.path.insert(0, ROOT)
+    import hp35
+    timings = {name: round(time_command(command, args.runs), 2) for name, command in cases.items()}
+    timings['importtime'] = round(import_time(args.runs), 2)
+    results = load_results()
+    previous = [version for version in results if version != hp35.__version__]
+    print('hp35', hp35.__version__, 'cold start (median ms of', args.runs, 'runs)')
+    for name, value in timings.items():
+        line = '  {:<12}{:>10.2f}'.format(name, value)
+        if previous and name in results[previous[-1]]:
+            line += '   ({} was {:.2f})'.format(previous[-1], results[previous[-1]][name])
+        print(line)
+    if args.save:
+        results[hp35.__version__] = timings
+        with open(RESULTS, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Micro-benchmarks for the per-key path: every op function, on ordinary
+# values and on the values that make it wink, the display formatting in
+# each of its branches, and drawing the calculator with the output captured.
+#
+# Each entry is timed in --pairs short bursts, each straight after a burst
+# of a calibration case, plain Python that doesn't touch hp35, and what's
+# kept is the median of entry time over calibration time. A machine that
+# slows down for a few seconds, or is just slower, slows both halves of a
+# pair alike, so the ratio holds steady where the raw timings don't. The
+# nanoseconds shown are the median ratio times the calibration time.
+#
+# --save records the results as the baseline in baseline.json (or --baseline
+# FILE); --check compares the ratios against it and exits with status 1 if
+# any entry got slower than the baseline by more than --threshold per cent
+# and by more than --floor nanoseconds. The baseline.json in the tree is
+# only a reference: re-save it on the machine doing the checking. With no
+# baseline at all, --check says so and just reports the timings.
+#
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+import hp35  # noqa: E402
+
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+#
+# name: (op function, X, Y). The wink cases use values the HP-35 can't take.
+#
+ops = {'add': (hp35.add, 1.5, 2.25),
+       'subtract': (hp35.subtract, 1.5, 2.25),
+       'multiply': (hp35.multiply, 1.5, 2.25),
+       'divide': (hp35.divide, 1.5, 2.25),
+       'divide wink': (hp35.divide, 0.0, 2.25),
+       'reciprocal': (hp35.reciprocal, 1.5, 0.0),
+       'reciprocal wink': (hp35.reciprocal, 0.0, 0.0),
+       'square_root': (hp35.square_root, 2.0, 0.0),
+       'square_root wink': (hp35.square_root, -2.0, 0.0),
+       'log': (hp35.log, 2.0, 0.0),
+       'log wink': (hp35.log, 0.0, 0.0),
+       'ln': (hp35.ln, 2.0, 0.0),
+       'ln wink': (hp35.ln, -2.0, 0.0),
+       'sin': (hp35.sin, 30.0, 0.0),
+       'arcsin': (hp35.arcsin, 0.5, 0.0),
+       'arcsin wink': (hp35.arcsin, 2.0, 0.0),
+       'cos': (hp35.cos, 60.0, 0.0),
+       'arccos': (hp35.arccos, 0.5, 0.0),
+       'arccos wink': (hp35.arccos, 2.0, 0.0),
+       'tan': (hp35.tan, 45.0, 0.0),
+       'tan 90': (hp35.tan, 90.0, 0.0),
+       'arctan': (hp35.arctan, 1.0, 0.0),
+       'exp': (hp35.exp, 2.0, 10.0),
+       'exp clamp': (hp35.exp, 10.0, 200.0),
+       'exp wink': (hp35.exp, -2.0, 10.0),
+       'ex': (hp35.ex, 2.0, 0.0),
+       'ex clamp': (hp35.ex, 300.0, 0.0),
+       'ex wink': (hp35.ex, 1000.0, 0.0)}
+
+#
+# name: number, covering the branches of the display formatting
+#
+numbers = {'zero': 0.0,
+           'in range': 1234.5678,
+           'negative': -0.25,
+           'big': 4.562389e+16,
+           'small': -1.0045e-25,
+           'overflow': 1e+120,
+           'underflow': -1e+120}
+
+
+def op_case(function, x, y):
+    stack = hp35.Registers(x, y)
+
+    def case():
+        stack.X = x
+        stack.Y = y
+        function(stack)
+    return case
+
+
+def captured(function, *args):
+    def case():
+        with contextlib.redirect_stdout(io.StringIO()):
+            function(*args)
+    return case
+
+
+def ansi_frames():
+    #
+    # One differential frame: the LED cells and registers change each call
+    #
+    renderer = hp35.AnsiRenderer('white', True)
+    stack = hp35.Registers()
+    with contextlib.redirect_stdout(io.StringIO()):
+        renderer.calc(0.0, True, False)
+    values = [1.5, 2.75]
+
+    def case():
+        values.reverse()
+        stack.X = values[0]
+        renderer.calc(stack.X, True, False)
+        renderer.registers(stack)
+    return captured(case)
+
+
+class Slots:
+    __slots__ = ('X', 'Y')
+
+
+def calibration():
+    # About the size of an op: attributes, float arithmetic and a round()
+    stack = Slots()
+    stack.X = 1.5
+    stack.Y = 2.25
+
+    def case():
+        stack.X = round(stack.Y * stack.X + 0.5, 9)
+        stack.X = 1.5
+    return case
+
+
+def cases():
+    for name, (function, x, y) in ops.items():
+        yield 'op ' + name, op_case(function, x, y), 1
+    for name, value in numbers.items():
+        yield 'hp35_scientific_notation ' + name, (lambda v=value: hp35.hp35_scientific_notation(v)), 1
+        yield 'format_led ' + name, (lambda v=value: hp35.format_led(v)), 1
+        yield 'led_string ' + name, (lambda v=value: hp35.led_string(v)), 1
+    # Drawing is a lot slower than the rest, so it gets fewer calls
+    yield 'show_calc number', captured(hp35.show_calc, 1234.5678, 'white', True, False), 50
+    yield 'show_calc wink', captured(hp35.show_calc, 'wink', 'white', False, False), 50
+    yield 'display_registers', captured(hp35.display_registers, hp35.Registers(1.0, 2.0, 3.0, 4.0, 5.0)), 50
+    yield 'AnsiRenderer frame', ansi_frames(), 50
+
+
+def run(number, pattern=None, pairs=30):
+    #
+    # name: entry time over calibration time, and the calibration time per
+    # call in nanoseconds
+    #
+    reference = calibration()
+    ratios = {}
+    calibrations = []
+    for name, case, divisor in cases():
+        if pattern and pattern not in name:
+            continue
+        calls = max(1, number // divisor)
+        pair_ratios = []
+        for pair in range(pairs):
+            calibrated = timeit.timeit(reference, number=number) / number
+            pair_ratios.append(timeit.timeit(case, number=calls) / calls / calibrated)
+            calibrations.append(calibrated * 1e9)
+        ratios[name] = round(statistics.median(pair_ratios), 4)
+    return ratios, round(statistics.median(calibrations), 1)
+
+
+def main():
+    my_parser = argparse.ArgumentParser(prog="suite", description='Benchmark the hp35 per-key path.')
+    my_parser.add_argument('-n', '--number', type=int, default=2000, help='calls per burst, default is 2000')
+    my_parser.add_argument('-k', '--filter', help='only run entries whose name contains this')
+    my_parser.add_argument('--baseline', default=BASELINE, help='baseline file, default is benchmarks/baseline.json')
+    my_parser.add_argument('--save', action='store_true', help='save the results as the baseline')
+    my_parser.add_argument('--check', action='store_true', help='fail if an entry is slower than the baseline')
+    my_parser.add_argument('--threshold', type=float, default=25.0,
+                           help='per cent slower than the baseline that counts as a regression, default is 25')
+    my_parser.add_argument('--floor', type=float, default=50.0,
+                           help='nanoseconds slower than the baseline that counts as a regression, default is 50')
+    my_parser.add_argument('--pairs', type=int, default=30,
+                           help='bursts of each entry, each after a burst of calibration, default is 30')
+    args = my_parser.parse_args()
+    if args.number < 1 or args.pairs < 1:
+        my_parser.error('--number and --pairs must be at least 1')
+    baseline = {}
+    if args.check:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)['relative']
+        except FileNotFoundError:
+            print('suite: no baseline', args.baseline + ', not checking; make one with --save', file=sys.stderr)
+        except (OSError, ValueError, KeyError) as err:
+            print('suite: cannot read baseline', args.baseline + ':', err, file=sys.stderr)
+            return 2
+    ratios, calibrated = run(args.number, args.filter, args.pairs)
+    print('{:<40}{:>12.1f} ns'.format('calibration', calibrated))
+    results = {}
+    regressions = []
+    for name, ratio in ratios.items():
+        results[name] = round(ratio * calibrated, 1)
+        line = '{:<40}{:>12.1f} ns'.format(name, results[name])
+        if name in baseline:
+            change = (ratio - baseline[name]) / baseline[name] * 100.0
+            line += '  {:+7.1f}%'.format(change)
+            if change > args.threshold and (ratio - baseline[name]) * calibrated > args.floor:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'version': hp35.__version__, 'python': sys.version.split()[0], 'calibration': calibrated,
+                       'results': results, 'relative': ratios}, f, indent=2)
+            f.write('\n')
+    if regressions:
+        print(len(regressions), 'entries regressed by more than', args.threshold, 'per cent', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,35 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import argparse
-from argparse import RawTextHelpFormatter
 import sys
-import numpy as np
+import collections
+import functools
 import math
-import textwrap
 import time
-from getkey import getkey, keys
 import hp35data as hpdata
-from termcolor import cprint
+
+#
+# argparse, getkey and termcolor are only needed by the interactive calculator,
+# so they're imported where they're used. That keeps 'import hp35' and short
+# runs like 'hp35 --version' or 'hp35 --keys' quick to start.
+#
+__version__ = '1.1.0'
+#
+# Bumped whenever what a key leaves in the registers, or how a value is
+# shown, changes, in this module or in hp35bcd. Results kept from an earlier
+# run (hp35cache) are only good for the same arithmetic version.
+#
+ARITHMETIC_VERSION = 3
+
+
+def format_scientific(number):
+    #
+    # 10 significant digits in e-notation with at least two exponent digits,
+    # e.g. '1.234500000e+16'. This is the same string numpy's
+    # format_float_scientific(number, exp_digits=2, unique=False, precision=9)
+    # gives, without having to load numpy.
+    #
+    return '%.9e' % number
 
 
 def hp35_scientific_notation(number):
@@ -70,7 +89,7 @@ def hp35_scientific_notation(number):
     in_range = lo < number < hi
     if not in_range:
         # Break the number into a mantissa and exponent and make it a string
-        s_number = str(np.format_float_scientific(number, exp_digits=2, unique=False, precision=9))
+        s_number = format_scientific(number)
         # Convert string to a list, so we can get at the characters because of Python's immutable strings
         # Convert to a list (which would be indexed 0-14)
         sl = list(s_number)
@@ -93,7 +112,7 @@ def hp35_scientific_notation(number):
                 sl[15] = sl[exp2_loc]
         # Remove the e and replace the + with a space if number is big or
         # with a - sign if the number is small.
-        if hi < number:
+        if hi <= number:
             sl[13] = ' '
         else:
             sl[13] = '-'
@@ -110,20 +129,59 @@ def hp35_scientific_notation(number):
     return s_number, positive, sci_note
 
 
-def show_calc(display, disp_col, valid_number, off):
+def format_led(number):
+    #
+    # Build the 15 character LED string for a number in one go, straight from
+    # its digits. It gives exactly what show_calc() used to make from
+    # hp35_scientific_notation() with rstrip, textwrap.shorten and ljust:
+    #
+    #   ' 9.999999999 99' and '-9.999999999 99' past the ends of the range,
+    #   the sign (or a space), the mantissa with trailing zeros blanked,
+    #   then a space or a minus sign and the exponent when in scientific
+    #   notation,
+    #   otherwise the number itself with no trailing zeros, cut to 15
+    #   characters.
+    #
+    number = float(number)
+    if number == 0.0:
+        if math.copysign(1.0, number) < 0.0:
+            return '-0.            '
+        return '0.             '
+    if number >= 9.99999999e+99:
+        return ' 9.999999999 99'
+    if number < -9.99999999e+99:
+        return '-9.999999999 99'
+    sign = '-' if number < 0.0 else ''
+    number = abs(number)
+    if 0.01 < number < 1000000000.0:
+        return (sign + repr(number)).rstrip('0')[:15].ljust(15)
+    digits = format_scientific(number)
+    mantissa = digits[:11].rstrip('0').ljust(11)
+    exp_sign = ' ' if 1000000000.0 <= number else '-'
+    return (sign or ' ') + mantissa + exp_sign + digits[13:]
+
+
+cached_led = functools.lru_cache(maxsize=1024)(format_led)
+
+
+def led_string(number):
+    #
+    # Cached front end to format_led() for the display. 0.0 and -0.0 are the
+    # same key to the cache but don't look the same, so zero skips it.
+    #
+    number = float(number)
+    if number == 0.0:
+        return format_led(number)
+    return cached_led(number)
+
+
+def led_text(display, valid_number, off):
     #
     # Lot of fooling around here to get things to fit in the
     # display properly as per the 1972 HP-35 'standard'
     #
     if valid_number:
-        number = float(display)
-        led_display, positive, sci_note = hp35_scientific_notation(number)
-        if not positive and not sci_note:
-            led_display = '-' + led_display
-        if not sci_note:
-            led_display = led_display.rstrip("0")
-            led_display = textwrap.shorten(led_display, width=15, placeholder='')
-        led_display = led_display.ljust(15, ' ')
+        led_display = led_string(display)
     #
     # When the calculator off, the display should be blank.
     #
@@ -137,11 +195,16 @@ def show_calc(display, disp_col, valid_number, off):
         led_display = '0.0            '
     else:
         led_display = display.ljust(15, ' ')
+    return led_display
+
+
+def show_calc(display, disp_col, valid_number, off):
     #
     # Double space characters to make them
     # look more like the original LED display
     #
-    spaced_chars = ' '.join(led_display)
+    from termcolor import cprint
+    spaced_chars = ' '.join(led_text(display, valid_number, off))
     print("┌--------------------------------------┐")
     if display != 'wink':
         vertical_1 = '|     '
@@ -158,29 +221,11 @@ def show_calc(display, disp_col, valid_number, off):
     print("|______________________________________|")
     print("|                                      |")
     if off:
-        print("|   OFF═ ON                            |")
+        print(hpdata.switch_off)
     else:
-        print("|   OFF ═ON                            |")
-    print("|                                      |")
-    print("|   Xʸ     log    ln      eˣ    CLR    |")
-    print("|                                      |")
-    print("|   √x     arc    sin    cos    tan    |")
-    print("|                                      |")
-    print("|   1/x    x⇆y    R↓     STO    RCL    |")
-    print("|                                      |")
-    print("|   ENTER↑       CHS    E EX   CL x    |")
-    print("|                                      |")
-    print("|     -      7        8        9       |")
-    print("|                                      |")
-    print("|     +      4        5        6       |")
-    print("|                                      |")
-    print("|     X      1        2        3       |")
-    print("|                                      |")
-    print("|     ÷      0        ·        𝛑       |")
-    print("|                                      |")
-    print("|______________________________________|")
-    print("|  h/p  H E W L E T T - P A C K A R D  |")
-    print("└--------------------------------------┘")
+        print(hpdata.switch_on)
+    for line in hpdata.keyboard:
+        print(line)
 
 
 def python_check():
@@ -197,15 +242,8 @@ def python_check():
 
 def display_key_menu():
     print()
-    print('off  on')
-    print('xy', '    log', '    ln', '  ex', '  clr')
-    print('rx', ' a<s,c,t>', '  sin', ' cos', ' tan')
-    print('1x', '     rv', '    rd', '  sto', ' rcl')
-    print('e(nter)', '       chs', ' eex', ' clx')
-    print('-', '       7', '      8', '      9')
-    print('+', '       4', '      5', '      6')
-    print('x', '       1', '      2', '      3')
-    print('/', '       0', '      .', '     pi')
+    for line in hpdata.key_menu:
+        print(line)
     print()
 
 
@@ -240,63 +278,109 @@ def get_cmd(choice):
                 pass
             else:
                 choice = choice + '.'
-        legal_key = choice in hpdata.key_list or a_number
+        legal_key = choice in hpdata.key_table or choice in hpdata.command_keys or a_number
         if not legal_key:
             print("Invalid entry")
             print()
     return choice, a_number
 
 
-def reverse_xy(stack):
-    temp = stack["Y"]
-    stack["Y"] = stack["X"]
-    stack["X"] = temp
-    return stack
+class Registers:
+    #
+    # The HP-35's register file: the X, Y, Z and T stack registers and the
+    # memory register M. The stack moves work in place, and every op
+    # function takes one of these. With __slots__ it's small, quick to get
+    # at and pickles as a single object.
+    #
+    __slots__ = ('T', 'Z', 'Y', 'X', 'M')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0, t=0.0, m=0.0):
+        self.X = x
+        self.Y = y
+        self.Z = z
+        self.T = t
+        self.M = m
+
+    def __repr__(self):
+        return 'Registers(x={!r}, y={!r}, z={!r}, t={!r}, m={!r})'.format(*self.values())
 
+    def __eq__(self, other):
+        if not isinstance(other, Registers):
+            return NotImplemented
+        return self.values() == other.values()
 
-def push_stack(stack):
-    stack["T"] = stack["Z"]
-    stack["Z"] = stack["Y"]
-    stack["Y"] = stack["X"]
-    return stack
+    def values(self):
+        return self.X, self.Y, self.Z, self.T, self.M
 
+    def items(self):
+        # The stack from the top down, the way display_registers() shows it
+        return [("T", self.T), ("Z", self.Z), ("Y", self.Y), ("X", self.X)]
 
-def rotate_stack(stack):
-    temp = stack["X"]
-    stack["X"] = stack["Y"]
-    stack["Y"] = stack["Z"]
-    stack["Z"] = stack["T"]
-    stack["T"] = temp
-    return stack
+    def lift(self):
+        # ENTER↑
+        self.T = self.Z
+        self.Z = self.Y
+        self.Y = self.X
 
+    def roll(self):
+        # R↓
+        self.X, self.Y, self.Z, self.T = self.Y, self.Z, self.T, self.X
 
-def clear_stack(stack):
-    stack["T"] = float(0.0)
-    stack["Z"] = float(0.0)
-    stack["Y"] = float(0.0)
-    stack["X"] = float(0.0)
-    return stack
+    def swap(self):
+        # x⇆y
+        self.X, self.Y = self.Y, self.X
 
+    def clear_stack(self):
+        self.T = float(0.0)
+        self.Z = float(0.0)
+        self.Y = float(0.0)
+        self.X = float(0.0)
 
-def mem_func(mem, stack, action):
-    if action == 'sto':
-        mem = stack["X"]
-        return mem, stack
-    elif action == 'rcl':
-        stack["X"] = mem
-        return mem, stack
-    elif action == 'clr':
-        mem = float(0.0)
-        return mem, stack
+    def clear(self):
+        # CLR clears the memory as well as the stack
+        self.clear_stack()
+        self.M = float(0.0)
+
+    def store(self):
+        self.M = self.X
+
+    def recall(self):
+        self.X = self.M
+
+
+class Engine:
+    #
+    # The arithmetic behind the keys: the handler for each key, how a typed
+    # number or exponent becomes a register value, how a value is shown on
+    # the LED display and what zero is. float_engine is this module's own;
+    # hp35bcd has one that works in decimal digits.
+    #
+    __slots__ = ('name', 'dispatch', 'entry_value', 'exponent_value', 'led_string', 'from_float', 'zero')
+
+    def __init__(self, name, dispatch, entry_value, exponent_value, led_string, from_float, zero):
+        self.name = name
+        self.dispatch = dispatch
+        self.entry_value = entry_value
+        self.exponent_value = exponent_value
+        self.led_string = led_string
+        self.from_float = from_float
+        self.zero = zero
+
+    def __repr__(self):
+        return 'Engine(' + repr(self.name) + ')'
+
+    def registers(self):
+        # A cleared set of registers holding this engine's values
+        return Registers(*[self.zero] * 5)
 
 
 def dump_zeros(stack):
-    chars = str(stack["X"])
+    chars = str(stack.X)
     chars = chars.rstrip("0")
     return chars
 
 
-def get_exponent(stack, mem, disp_col):
+def get_exponent(stack, renderer):
     #
     # Some complex programming here because of the 1972 technical limitations of the HP-35 and
     # Python's immutable strings.
@@ -305,7 +389,7 @@ def get_exponent(stack, mem, disp_col):
     # Precision of the HP-35 is 9 digits. Python's float might have 'noise' beyond that, so
     # round off to 9
     #
-    temp = round(float(stack["X"]), 9)
+    temp = round(float(stack.X), 9)
     if temp == 0.0:
         temp = 1.0
     led_display, positive, sci_note = hp35_scientific_notation(temp)
@@ -318,6 +402,7 @@ def get_exponent(stack, mem, disp_col):
         led_display = led_display.ljust(15, ' ')
         # Stick 00s in last two locations in preparation for the entering of the exponent. Temporarily
         # make it a list to do this.
+    from getkey import getkey, keys
     lst = list(led_display)
     lst[13] = '0'
     lst[14] = '0'
@@ -325,18 +410,10 @@ def get_exponent(stack, mem, disp_col):
     while True:
         #
         # Don't display the entire calculator during the 'E EX' function
-        spaced_chars = ' '.join(led_display)
-        print("┌--------------------------------------┐")
-        vertical_1 = '|     '
-        vertical_2 = '    |'
-        print(vertical_1, end='')
-        cprint(spaced_chars, disp_col, attrs=['bold'], sep="", end='')
-        print(vertical_2)
-        print("|______________________________________|")
+        renderer.exponent(led_display)
         key = ''
         while key not in hpdata.eex_list:
-            print()
-            print('> ')
+            renderer.exponent_prompt()
             key = getkey()
             if key == keys.NEW_LINE:
                 break
@@ -366,30 +443,43 @@ def get_exponent(stack, mem, disp_col):
         mantissa = mantissa + str(lst[i])
     mantissa = float(mantissa)
     result = float(mantissa * mult)
-    stack["X"] = result
+    stack.X = result
     action_chars = dump_zeros(stack)
-    return action_chars, stack, mem
+    return action_chars
+
+
+def scaled_round(number):
+    #
+    # round(number, 9) the way NumPy does it: scaled up by 10**9, rounded
+    # half to even and scaled back down. That isn't exact on the decimal
+    # value, so a near-tie can go the other way from round(). ln and the
+    # inverse trig functions had NumPy results rounded like this, so they
+    # still are and the last digit shown doesn't change.
+    #
+    if not math.isfinite(number):
+        return number
+    return math.copysign(round(number * 1e9) / 1e9, number)
 
 
 def add(stack):
-    total = stack["X"] + stack["Y"]
-    stack["X"] = round(total, 9)
+    total = stack.X + stack.Y
+    stack.X = round(total, 9)
     return
 
 
 def subtract(stack):
-    difference = stack["Y"] - stack["X"]
-    stack["X"] = round(difference, 9)
+    difference = stack.Y - stack.X
+    stack.X = round(difference, 9)
     return
 
 
 def multiply(stack):
     try:
         wink = False
-        product = stack["Y"] * stack["X"]
-        stack["X"] = round(product, 9)
+        product = stack.Y * stack.X
+        stack.X = round(product, 9)
     except OverflowError:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
@@ -397,10 +487,10 @@ def multiply(stack):
 def divide(stack):
     try:
         wink = False
-        quotient = stack["Y"] / stack["X"]
-        stack["X"] = round(quotient, 9)
+        quotient = stack.Y / stack.X
+        stack.X = round(quotient, 9)
     except ZeroDivisionError:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
@@ -408,11 +498,11 @@ def divide(stack):
 def reciprocal(stack):
     try:
         wink = False
-        number = stack["X"]
+        number = stack.X
         quotient = 1.0 / number
-        stack["X"] = round(quotient, 9)
+        stack.X = round(quotient, 9)
     except ZeroDivisionError:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
@@ -420,118 +510,118 @@ def reciprocal(stack):
 def square_root(stack):
     try:
         wink = False
-        number = stack["X"]
+        number = stack.X
         root = math.sqrt(number)
-        stack["X"] = round(root, 9)
+        stack.X = round(root, 9)
     except ValueError:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
 
 def log(stack):
     wink = False
-    number = float(stack["X"])
+    number = float(stack.X)
     if number > 0.0:
         the_log = math.log10(number)
-        stack["X"] = round(the_log, 9)
+        stack.X = round(the_log, 9)
     else:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
 
 def ln(stack):
     wink = False
-    number = float(stack["X"])
+    number = float(stack.X)
     if number > 0.0:
-        the_log = np.log(number)
-        stack["X"] = round(the_log, 9)
+        the_log = math.log(number)
+        stack.X = scaled_round(the_log)
     else:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
 
 def sin(stack):
-    number = float(stack["X"])
+    number = float(stack.X)
     sine = math.sin(math.radians(number))
-    stack["X"] = round(sine, 9)
+    stack.X = round(sine, 9)
     return
 
 
 def arcsin(stack):
     wink = False
-    number = float(stack["X"])
+    number = float(stack.X)
     in_range = -1 <= number <= 1
     if in_range:
-        temp = np.arcsin(number)
-        asin = np.rad2deg(temp)
-        stack["X"] = round(asin, 9)
+        temp = math.asin(number)
+        asin = math.degrees(temp)
+        stack.X = scaled_round(asin)
     else:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
 
 def cos(stack):
-    number = float(stack["X"])
+    number = float(stack.X)
     cosine = math.cos(math.radians(number))
-    stack["X"] = round(cosine, 9)
+    stack.X = round(cosine, 9)
     return
 
 
 def arccos(stack):
     wink = False
-    number = float(stack["X"])
+    number = float(stack.X)
     in_range = -1 <= number <= 1
     if in_range:
-        temp = np.arccos(number)
-        acos = np.rad2deg(temp)
-        stack["X"] = round(acos, 9)
+        temp = math.acos(number)
+        acos = math.degrees(temp)
+        stack.X = scaled_round(acos)
     else:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
 
 def tan(stack):
-    number = float(stack["X"])
+    number = float(stack.X)
     if number / 90.0 == 1.0:
         tangent = float(9.99999999e99)
     elif number / 90.0 == 3.0:
         tangent = float(-9.99999999e99)
     else:
         tangent = math.tan(math.radians(number))
-    stack["X"] = round(tangent, 9)
+    stack.X = round(tangent, 9)
     return
 
 
 def arctan(stack):
-    number = float(stack["X"])
-    temp = np.arctan(number)
-    atan = np.rad2deg(temp)
-    stack["X"] = round(atan, 9)
+    number = float(stack.X)
+    temp = math.atan(number)
+    atan = math.degrees(temp)
+    stack.X = scaled_round(atan)
     return
 
 
 def exp(stack):
     wink = False
-    x = float(stack["X"])
-    y = float(stack["Y"])
+    x = float(stack.X)
+    y = float(stack.Y)
     if x >= 0.0:
         try:
             x_to_y = math.pow(x, y)
             if x_to_y > 9.99999999e+99:
-                stack["X"] = 9.99999999e+99
+                stack.X = 9.99999999e+99
             else:
-                stack["X"] = round(x_to_y, 9)
+                stack.X = round(x_to_y, 9)
         except OverflowError:
-            stack["X"] = float(0.0)
+            stack.X = float(0.0)
             wink = True
         return wink
     else:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
@@ -539,107 +629,617 @@ def exp(stack):
 def ex(stack):
     wink = False
     try:
-        number = float(stack["X"])
+        number = float(stack.X)
         e_to_x = math.exp(number)
         if e_to_x > 9.99999999e+99:
-            stack["X"] = 9.99999999e+99
+            stack.X = 9.99999999e+99
         else:
-            stack["X"] = round(e_to_x, 9)
+            stack.X = round(e_to_x, 9)
     except OverflowError:
-        stack["X"] = float(0.0)
+        stack.X = float(0.0)
         wink = True
     return wink
 
 
-def process_action_keys(cmd, disp_col, stack, mem):
+def clear_x(stack):
+    stack.X = float(0.0)
+
+
+def change_sign(stack):
+    temp = float(stack.X)
+    stack.X = temp * -1.0
+
+
+def key_handler(name):
+    # An op function in this module, or else one of the Registers stack moves
+    return globals().get(name) or getattr(Registers, name)
+
+
+#
+# Key -> handler, built once from the table in hp35data
+#
+dispatch = {key: key_handler(spec.handler) for key, spec in hpdata.key_table.items() if spec.handler}
+
+#
+# An hp35trace.Tracer while --trace is on. Every key that changes the
+# registers is passed to it along with them.
+#
+tracer = None
+
+
+def execute_key(cmd, stack, table=dispatch):
+    #
+    # The calculating part of a keystroke, with no terminal I/O, so it can be
+    # driven from the interactive loop or from a replayed keystroke script.
+    # 'off', 'on' and 'eex' need the terminal and are dealt with by the caller.
+    # Returns True if the key winked.
+    #
+    handler = table.get(cmd)
+    if handler is None:
+        return False
+    wink = bool(handler(stack))
+    if tracer is not None:
+        tracer.record(cmd, stack, wink)
+    return wink
+
+
+def process_action_keys(cmd, renderer, stack, engine=None):
     #
-    # First the memory/stack/clr, etc., keys
+    # First the keys that need the terminal, then hand the rest to the engine
     #
+    engine = engine or float_engine
     wink = False
     if cmd == 'off':
         action_chars = ''
-        show_calc(action_chars, disp_col, False, True)
-        print('HP-35 is powering down')
+        renderer.calc(action_chars, False, True)
+        renderer.message('HP-35 is powering down')
         time.sleep(0.3)  # Time delay for slower systems to allow the display to update before exit
         sys.exit(0)
     if cmd == 'on':
-        print("Calculator is already on.")
-        print()
-    elif cmd == 'clr':
-        stack = clear_stack(stack)
-        dump_zeros(stack)
-        mem, stack = mem_func(mem, stack, cmd)
-    elif cmd == 'e':
-        stack = push_stack(stack)
-    elif cmd == 'rd':
-        stack = rotate_stack(stack)
-    elif cmd == 'rv':
-        stack = reverse_xy(stack)
-    elif cmd == 'sto':
-        mem, stack = mem_func(mem, stack, cmd)
-    elif cmd == 'rcl':
-        mem, stack = mem_func(mem, stack, cmd)
-    elif cmd == 'clx':
-        stack["X"] = float(0.0)
-    elif cmd == 'chs':
-        temp = float(stack["X"])
-        stack["X"] = temp * -1.0
+        renderer.message("Calculator is already on.\n")
     elif cmd == 'eex':
-        action_chars, stack, mem = get_exponent(stack, mem, disp_col)
-    elif cmd == '+':
-        add(stack)
-    elif cmd == '-':
-        subtract(stack)
-    elif cmd == 'x':
-        wink = multiply(stack)
-    elif cmd == '/':
-        wink = divide(stack)
-    elif cmd == '1x':
-        wink = reciprocal(stack)
-    elif cmd == 'rx':
-        wink = square_root(stack)
-    elif cmd == 'log':
-        wink = log(stack)
-    elif cmd == 'ln':
-        wink = ln(stack)
-    elif cmd == 'sin':
-        sin(stack)
-    elif cmd == 'as':
-        wink = arcsin(stack)
-    elif cmd == 'cos':
-        cos(stack)
-    elif cmd == 'ac':
-        wink = arccos(stack)
-    elif cmd == 'tan':
-        tan(stack)
-    elif cmd == 'at':
-        arctan(stack)
-    elif cmd == 'xy':
-        wink = exp(stack)
-    elif cmd == 'ex':
-        wink = ex(stack)
+        action_chars = get_exponent(stack, renderer)
+        # The exponent is keyed in as a float
+        stack.X = engine.from_float(stack.X)
+        if tracer is not None:
+            tracer.record('eex', stack, False)
+    else:
+        wink = execute_key(cmd, stack, engine.dispatch)
     if wink:
-        return 'wink', stack, mem
+        return 'wink'
     else:
         action_chars = dump_zeros(stack)
-        return action_chars, stack, mem
+        return action_chars
+
+
+def enter_number(number, stack):
+    #
+    # A number typed in goes straight into the X register
+    #
+    stack.X = entry_value(number)
+
+
+def entry_value(number):
+    #
+    # The value of a number as typed in, rounded to the HP-35's 10
+    # significant digits if it needs scientific notation.
+    #
+    lo = 0.01
+    hi = 1000000000.0
+    number = float(number)
+    in_range = lo < number < hi
+    if in_range:
+        return number
+    else:
+        return float(format_scientific(number))
+
+
+def parse_keys(text):
+    #
+    # Split a keystroke script into tokens. Keys are separated by white space
+    # and anything after a '#' on a line is a comment.
+    #
+    tokens = []
+    for line in text.splitlines():
+        line = line.split('#', 1)[0]
+        tokens.extend(line.split())
+    return tokens
+
+
+def parse_exponent(tokens):
+    #
+    # The exponent token that follows 'eex' in a script, given as a list of
+    # zero or one tokens
+    #
+    if not tokens or not tokens[0].lstrip('-').isdigit() or len(tokens[0].lstrip('-')) > 2:
+        raise ValueError("'eex' needs a one or two digit exponent after it")
+    return int(tokens[0])
 
 
-def display_registers(mem, stack):
+def exponent_value(number, exponent):
+    #
+    # What X becomes when an exponent is keyed in. As on the keyboard, the
+    # exponent replaces any exponent X is already showing and a zero mantissa
+    # becomes 1
+    #
+    mantissa = round(float(number), 9)
+    if mantissa == 0.0:
+        mantissa = 1.0
+    elif not 0.01 < abs(mantissa) < 1000000000.0:
+        mantissa = float(format_scientific(mantissa).split('e')[0])
+    return entry_value(mantissa * 10.0 ** exponent)
+
+
+float_engine = Engine('float', dispatch, entry_value, exponent_value, led_string, float, 0.0)
+
+
+def get_engine(name):
+    #
+    # 'float' or 'bcd'. hp35bcd is only loaded if it's asked for.
+    #
+    if name == 'bcd':
+        import hp35bcd
+        return hp35bcd.engine
+    if name != 'float':
+        raise ValueError("Unknown engine '" + name + "'")
+    return float_engine
+
+
+def replay_keys(tokens, stack, engine=None):
+    #
+    # Run a keystroke script without the terminal: no display, no getkey and
+    # no termcolor, just the engine. 'eex' takes the exponent from the next
+    # token (e.g. '1.5 eex -12') and 'off' stops the replay.
+    # The registers are updated in place; the (step, key) pairs that winked
+    # are returned.
+    #
+    engine = engine or float_engine
+    winks = []
+    step = 0
+    while step < len(tokens):
+        cmd = tokens[step]
+        if cmd == 'pi':
+            cmd = '3.141592654'
+        if is_number(cmd):
+            stack.X = engine.entry_value(cmd)
+            if tracer is not None:
+                tracer.record('number', stack, False)
+        elif cmd == 'off':
+            break
+        elif cmd == 'on':
+            pass
+        elif cmd == 'eex':
+            step += 1
+            stack.X = engine.exponent_value(stack.X, parse_exponent(tokens[step:step + 1]))
+            if tracer is not None:
+                tracer.record('eex', stack, False)
+        elif cmd in hpdata.key_table:
+            wink = execute_key(cmd, stack, engine.dispatch)
+            if wink:
+                winks.append((step, cmd))
+        else:
+            raise ValueError("Invalid entry '" + cmd + "'")
+        step += 1
+    return winks
+
+
+def run_script(text, registers, engine=None):
+    #
+    # Headless entry point for --keys and --script. Only the chosen
+    # registers are printed, X alone by default.
+    #
+    engine = engine or float_engine
+    stack = engine.registers()
+    try:
+        winks = replay_keys(parse_keys(text), stack, engine)
+    except ValueError as err:
+        print('hp35:', err, file=sys.stderr)
+        return 2
+    for step, cmd in winks:
+        print('hp35: wink at step', step + 1, "('" + cmd + "')", file=sys.stderr)
+    if len(registers) == 1:
+        print(getattr(stack, registers))
+    else:
+        for reg in registers:
+            print(reg, ':', getattr(stack, reg))
+    return 1 if winks else 0
+
+
+class History:
+    #
+    # Undo and redo for the registers. Each step is the tuple of the five
+    # register values as a key found them. The values themselves are never
+    # copied, only referred to, so a step costs five references however
+    # many keys share them, and only keys that change something are kept.
+    # Both lists hold at most limit steps; the oldest go first.
+    #
+    def __init__(self, limit=1000):
+        self.limit = limit
+        self.undo_steps = collections.deque(maxlen=limit)
+        self.redo_steps = collections.deque(maxlen=limit)
+
+    def __len__(self):
+        return len(self.undo_steps)
+
+    def record(self, before, stack):
+        # before is stack.values() from ahead of the key
+        if before != stack.values():
+            self.undo_steps.append(before)
+            self.redo_steps.clear()
+
+    @staticmethod
+    def restore(stack, values):
+        # In place, so anything holding on to the registers sees the change
+        stack.X, stack.Y, stack.Z, stack.T, stack.M = values
+
+    def undo(self, stack):
+        # False if there's nothing to undo
+        if not self.undo_steps:
+            return False
+        self.redo_steps.append(stack.values())
+        self.restore(stack, self.undo_steps.pop())
+        return True
+
+    def redo(self, stack):
+        if not self.redo_steps:
+            return False
+        self.undo_steps.append(stack.values())
+        self.restore(stack, self.redo_steps.pop())
+        return True
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+
+
+#
+# What Calculator.press() and Calculator.run() return: whether all went well,
+# the (step, key) pairs that winked, the error message if not, and X as a
+# float and as the LED display shows it. For the 'bcd' engine that's the
+# float nearest the 10 digits; calc.X is X as the engine keeps it, an
+# hp35bcd.Number.
+#
+Result = collections.namedtuple('Result', ['ok', 'winks', 'error', 'x', 'display'])
+
+
+class Calculator:
+    #
+    # The calculator as a library: no terminal, no getkey or termcolor and
+    # no sys.exit(). Keys go in one at a time with press() or as a sequence
+    # with run(), and come back as a Result; a bad key is an error in the
+    # Result rather than an exception. The registers can be read and set as
+    # calc.X, calc.Y and so on. 'undo' and 'redo' step back and forward
+    # through the last history keys that changed the registers.
+    #
+    #   calc = hp35.Calculator()
+    #   calc.run('3 e 4 +').display    -> '7.             '
+    #
+    def __init__(self, engine='float', history=1000):
+        self.engine = get_engine(engine) if isinstance(engine, str) else engine
+        self.stack = self.engine.registers()
+        self.history = History(history)
+        self.on = True
+        self.exponent = False
+
+    def __repr__(self):
+        return 'Calculator(' + repr(self.stack) + ')'
+
+    def __getattr__(self, name):
+        if name in Registers.__slots__:
+            return getattr(self.stack, name)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in Registers.__slots__:
+            before = self.stack.values()
+            setattr(self.stack, name, self.engine.entry_value(value))
+            self.history.record(before, self.stack)
+        else:
+            object.__setattr__(self, name, value)
+
+    @property
+    def display(self):
+        if not self.on:
+            return '               '
+        return self.engine.led_string(self.stack.X)
+
+    def registers(self):
+        return collections.OrderedDict((reg, getattr(self.stack, reg)) for reg in 'XYZTM')
+
+    def step(self, key):
+        #
+        # One key. Returns True if it winked; raises ValueError for a key
+        # that can't be taken.
+        #
+        key = str(key)
+        if key in hpdata.command_keys and self.on and not self.exponent:
+            if not getattr(self.history, key)(self.stack):
+                raise ValueError('Nothing to ' + key)
+            if tracer is not None:
+                tracer.record(key, self.stack, False)
+            return False
+        before = self.stack.values()
+        try:
+            return self.apply(key)
+        finally:
+            self.history.record(before, self.stack)
+
+    def apply(self, key):
+        if self.exponent:
+            # The key after 'eex' is the exponent
+            self.exponent = False
+            self.stack.X = self.engine.exponent_value(self.stack.X, parse_exponent([key]))
+            if tracer is not None:
+                tracer.record('eex', self.stack, False)
+            return False
+        if not self.on:
+            if key != 'on':
+                raise ValueError('The calculator is off')
+            self.on = True
+            return False
+        if key == 'pi':
+            key = '3.141592654'
+        if is_number(key):
+            self.stack.X = self.engine.entry_value(key)
+            if tracer is not None:
+                tracer.record('number', self.stack, False)
+        elif key == 'off':
+            self.on = False
+        elif key == 'eex':
+            self.exponent = True
+        elif key in hpdata.key_table:
+            return execute_key(key, self.stack, self.engine.dispatch)
+        else:
+            raise ValueError("Invalid entry '" + key + "'")
+        return False
+
+    def result(self, winks, error=None):
+        return Result(error is None, winks, error, float(self.stack.X), self.display)
+
+    def press(self, key):
+        try:
+            wink = self.step(key)
+        except (ArithmeticError, ValueError) as err:
+            return self.result([], str(err))
+        return self.result([(0, str(key))] if wink else [])
+
+    def run(self, keys):
+        #
+        # A keystroke sequence, as a string like '3 e 4 + sin' or a list of
+        # keys. It stops at 'off' or at the first key in error, leaving the
+        # registers as that key found them.
+        #
+        tokens = parse_keys(keys) if isinstance(keys, str) else list(keys)
+        winks = []
+        for position, key in enumerate(tokens):
+            try:
+                if self.step(key):
+                    winks.append((position, str(key)))
+            except (ArithmeticError, ValueError) as err:
+                return self.result(winks, str(err))
+            if not self.on:
+                break
+        return self.result(winks)
+
+    def clear(self):
+        self.stack = self.engine.registers()
+        self.history.clear()
+        self.on = True
+        self.exponent = False
+
+
+def display_registers(stack):
     print()
-    print('M :', mem)
+    print('M :', stack.M)
     print()
     for cmd, value in stack.items():
         print(cmd, ':', value)
 
 
+class LineRenderer:
+    #
+    # The original line-oriented output: the whole calculator is printed
+    # again after every key.
+    #
+    def __init__(self, disp_col, verbose):
+        self.disp_col = disp_col
+        self.verbose = verbose
+
+    def calc(self, display, valid_number, off):
+        show_calc(display, self.disp_col, valid_number, off)
+
+    def registers(self, stack):
+        if self.verbose:
+            display_registers(stack)
+
+    def menu(self):
+        display_key_menu()
+
+    def message(self, text):
+        print(text)
+
+    def exponent(self, led_display):
+        from termcolor import cprint
+        spaced_chars = ' '.join(led_display)
+        print("┌--------------------------------------┐")
+        print('|     ', end='')
+        cprint(spaced_chars, self.disp_col, attrs=['bold'], sep="", end='')
+        print('    |')
+        print("|______________________________________|")
+
+    def exponent_prompt(self):
+        print()
+        print('> ')
+
+
+class AnsiRenderer:
+    #
+    # Draws the calculator once, with the registers and the key menu beside
+    # it, and from then on rewrites only what changed (the LED cells, the
+    # OFF/ON switch and the register lines) using ANSI cursor addressing.
+    # Each frame goes to the terminal in a single write: calc() keeps its
+    # part back to go out with registers(), which always follows it, or with
+    # whatever else is written first.
+    #
+    led_row = 2
+    led_col = 7
+    switch_row = 5
+    panel_col = 44
+    prompt_row = 6 + len(hpdata.keyboard)
+
+    def __init__(self, disp_col, verbose):
+        self.disp_col = disp_col
+        self.verbose = verbose
+        self.drawn = False
+        self.led = None
+        self.off = None
+        self.lines = {}
+        self.message_shown = False
+        self.pending = []
+
+    @staticmethod
+    def fits():
+        #
+        # Room for the prompt row, and the row below it that Enter and the
+        # messages move down to, without scrolling what's been drawn
+        #
+        import shutil
+        size = shutil.get_terminal_size((0, 0))
+        return sys.stdout.isatty() and size.columns >= 80 and size.lines > AnsiRenderer.prompt_row + 1
+
+    @staticmethod
+    def goto(row, col):
+        return '\x1b[' + str(row) + ';' + str(col) + 'H'
+
+    def write(self, parts):
+        parts = self.pending + parts
+        self.pending = []
+        if parts:
+            sys.stdout.write(''.join(parts))
+            sys.stdout.flush()
+
+    def draw_body(self, parts):
+        parts.append('\x1b[2J\x1b[H')
+        parts.append("┌--------------------------------------┐\n")
+        parts.append("|                                      |\n")
+        parts.append("|______________________________________|\n")
+        parts.append("|                                      |\n")
+        parts.append(hpdata.switch_on + '\n')
+        parts.append('\n'.join(hpdata.keyboard))
+        menu_row = 11 if self.verbose else 2
+        for row, line in enumerate(hpdata.key_menu):
+            parts.append(self.goto(menu_row + row, self.panel_col) + line)
+        self.drawn = True
+
+    def led_cells(self, parts, led_display):
+        #
+        # Only the runs of LED cells that differ from the last frame are sent
+        #
+        from termcolor import colored
+        spaced_chars = ' '.join(led_display)
+        if self.led is None or self.led == 'wink' or len(spaced_chars) != len(self.led):
+            parts.append(self.goto(self.led_row, 1) + '|     ')
+            parts.append(colored(spaced_chars, self.disp_col, attrs=['bold']) + '    |  ')
+        else:
+            start = None
+            for i in range(len(spaced_chars) + 1):
+                changed = i < len(spaced_chars) and spaced_chars[i] != self.led[i]
+                if changed and start is None:
+                    start = i
+                elif not changed and start is not None:
+                    parts.append(self.goto(self.led_row, self.led_col + start))
+                    parts.append(colored(spaced_chars[start:i], self.disp_col, attrs=['bold']))
+                    start = None
+        self.led = spaced_chars
+
+    def calc(self, display, valid_number, off):
+        from termcolor import colored
+        parts = []
+        if not self.drawn:
+            self.draw_body(parts)
+        if display == 'wink':
+            if self.led != 'wink':
+                text = '    0.                                '
+                parts.append(self.goto(self.led_row, 2))
+                parts.append(colored(text, self.disp_col, attrs=['blink', 'bold']))
+                self.led = 'wink'
+        else:
+            self.led_cells(parts, led_text(display, valid_number, off))
+        if off != self.off:
+            parts.append(self.goto(self.switch_row, 1) + (hpdata.switch_off if off else hpdata.switch_on))
+            self.off = off
+        parts.append(self.goto(self.prompt_row, 1))
+        self.pending.extend(parts)
+
+    def registers(self, stack):
+        #
+        # Same lines as display_registers(), in a panel to the right
+        #
+        if not self.verbose:
+            self.write([])
+            return
+        lines = {3: 'M : ' + str(stack.M)}
+        for row, (cmd, value) in enumerate(stack.items()):
+            lines[5 + row] = cmd + ' : ' + str(value)
+        parts = []
+        for row, line in lines.items():
+            if self.lines.get(row) != line:
+                parts.append(self.goto(row, self.panel_col) + line + '\x1b[K')
+                self.lines[row] = line
+        if parts:
+            parts.append(self.goto(self.prompt_row, 1))
+        self.write(parts)
+
+    def menu(self):
+        #
+        # The menu never changes, so this just clears the way for the next
+        # prompt, and any old messages unless one has just been shown
+        #
+        parts = []
+        if not self.message_shown:
+            parts.append(self.goto(self.prompt_row + 1, 1) + '\x1b[J')
+        self.message_shown = False
+        parts.append(self.goto(self.prompt_row, 1) + '\x1b[2K')
+        self.write(parts)
+
+    def message(self, text):
+        self.write([self.goto(self.prompt_row + 1, 1), '\x1b[J', text, '\n'])
+        self.message_shown = True
+
+    def exponent(self, led_display):
+        parts = []
+        self.led_cells(parts, led_display)
+        self.write(parts)
+
+    def exponent_prompt(self):
+        self.write([self.goto(self.prompt_row, 1), '\x1b[2K> '])
+
+
+def make_renderer(disp_col, verbose, plain):
+    if not plain and AnsiRenderer.fits():
+        return AnsiRenderer(disp_col, verbose)
+    return LineRenderer(disp_col, verbose)
+
+
 def main():
     python_check()
     epi_text = "LED display colour codes: G=green,Y=yellow,R=red,B=blue,M=magenta,C=cyan. \nUse " \
                "'off' to turn off calculator and exit program.\n" \
+               "Use --keys or --script to run keystrokes without the display.\n" \
                "Read the 'hp35.pdf' file for more details about the use of this emulator"
-    my_parser = argparse.ArgumentParser(prog="hp35", formatter_class=RawTextHelpFormatter)
-    my_parser.add_argument('-v', '--version', action='version', version='%(prog)s 1.1.0')
+    import argparse
+
+    def positive_int(text):
+        # A count such as --jobs, which has to be at least 1
+        try:
+            value = int(text)
+        except ValueError:
+            value = 0
+        if value < 1:
+            raise argparse.ArgumentTypeError("must be a whole number of at least 1, not '" + text + "'")
+        return value
+    my_parser = argparse.ArgumentParser(prog="hp35", formatter_class=argparse.RawTextHelpFormatter)
+    my_parser.add_argument('-v', '--version', action='version', version='%(prog)s ' + __version__)
     my_parser.add_argument('-q', '--quiet', action='store_false',
                            help='display stack (X,Y,Z,T registers) and mem, Default is to display them')
     my_parser.add_argument('-d', '--display',
@@ -648,56 +1248,302 @@ def main():
                            default='W',
                            choices=['W', 'G', 'Y', 'R', 'B', 'M', 'C'],
                            )
+    my_parser.add_argument('-k', '--keys',
+                           help='run a keystroke sequence without the display, e.g. "3 e 4 + sin"',
+                           action='store')
+    my_parser.add_argument('-s', '--script',
+                           help="run the keystrokes in a file ('-' for stdin) without the display",
+                           action='store')
+    my_parser.add_argument('-r', '--registers',
+                           help='registers to print after --keys or --script, or to write with --npy, any of XYZTM.\n'
+                                'Default is X',
+                           action='store',
+                           default='X')
+    my_parser.add_argument('--program', metavar='KEYS',
+                           help='run KEYS on every line of stdin, which holds X and optionally Y, Z and T,\n'
+                                'and write X for each line to stdout')
+    my_parser.add_argument('--serve', metavar='ADDRESS', nargs='?', const='127.0.0.1:3535',
+                           help='serve calculator sessions on host:port or a Unix socket path,\n'
+                                'default is 127.0.0.1:3535')
+    my_parser.add_argument('--reply', choices=['led', 'x'], default='led',
+                           help='what --serve and --program send back for each line: the LED display or X.\n'
+                                'Default is led')
+    my_parser.add_argument('--max-sessions', type=int, default=10000,
+                           help='sessions --serve allows at once, default is 10000')
+    my_parser.add_argument('--batch', metavar='FILE',
+                           help="run the keystroke programs in a CSV or JSON lines file ('-' for stdin)")
+    my_parser.add_argument('--npy', metavar='KEYS',
+                           help='run KEYS over the .npy (or raw float64) files given with --column, a chunk at\n'
+                                'a time, writing the --registers and the wink mask to .npy files named from --output')
+    my_parser.add_argument('--column', metavar='REG=FILE', action='append', default=[],
+                           help='starting values of a register for --npy, e.g. X=x.npy. Can be repeated')
+    my_parser.add_argument('--output', metavar='FILE',
+                           help='where --batch writes its results, default is stdout, or the prefix for\n'
+                                "--npy's output files, default is 'hp35-'")
+    my_parser.add_argument('--format', choices=['csv', 'jsonl', 'led'],
+                           help='--batch input and output format (csv or jsonl), default is from the file name,\n'
+                                'or --tabulate output format (csv or led), default is csv')
+    my_parser.add_argument('--cache', metavar='FILE',
+                           help='keep --batch results in the sqlite file FILE and reuse them for repeated records')
+    my_parser.add_argument('-j', '--jobs', type=positive_int,
+                           help='processes for --batch, default is one per CPU, or for --tabulate, default is 1')
+    my_parser.add_argument('--chunk-size', type=positive_int,
+                           help='records per --batch work unit, default is 1000, values per --npy chunk,\n'
+                                'default is 1048576, or rows per --tabulate chunk, default is 4096')
+    my_parser.add_argument('--solve', metavar='KEYS',
+                           help='find an X between the --bracket values where KEYS leave 0 in X,\n'
+                                'e.g. --solve "e x e 2 -" --bracket 0 2')
+    my_parser.add_argument('--bracket', metavar=('A', 'B'), nargs=2, type=float,
+                           help='the range --solve looks in; f(A) and f(B) must differ in sign for\n'
+                                'brent and bisect')
+    my_parser.add_argument('--method', choices=['brent', 'bisect', 'secant', 'all'], default='brent',
+                           help='how --solve finds the root, default is brent')
+    my_parser.add_argument('--tabulate', metavar='KEYS',
+                           help='run KEYS from every X in the --x range, or every X and Y in the --x and --y\n'
+                                'grid, and write a table of the results to stdout')
+    my_parser.add_argument('--x', metavar='START:STOP:STEP', help='the X values for --tabulate, e.g. 0:90:15')
+    my_parser.add_argument('--y', metavar='START:STOP:STEP',
+                           help='the Y values for a --tabulate grid. A range that starts with a minus sign\n'
+                                'goes after an =, e.g. --y=-1:1:0.5')
+    my_parser.add_argument('--profile', action='store_true',
+                           help='time input, compute and rendering for every key and print a summary on exit')
+    my_parser.add_argument('--profile-json', metavar='FILE', help='write the --profile summary to FILE as JSON')
+    my_parser.add_argument('--journal', metavar='FILE',
+                           help='append every key and the registers to FILE, default is ~/.hp35.journal\n'
+                                'with --resume')
+    my_parser.add_argument('--resume', action='store_true',
+                           help='start with the registers the journal left, and carry on writing to it')
+    my_parser.add_argument('--engine', choices=['float', 'bcd'], default='float',
+                           help='arithmetic for the calculator, --keys, --script and --program: float, or bcd\n'
+                                'for 10 digit decimal like the real HP-35. Default is float')
+    my_parser.add_argument('--history', metavar='N', type=int, default=1000,
+                           help="how many keys 'undo' can step back through, default is 1000")
+    my_parser.add_argument('--trace', metavar='FILE',
+                           help='keep the last --trace-size keys and the registers after each in memory, and write\n'
+                                'them to FILE when a key winks, on a crash, on SIGUSR1 and at exit. Read it with\n'
+                                'hp35trace.py. For the calculator, --keys, --script and --serve')
+    my_parser.add_argument('--trace-size', metavar='N', type=int, default=65536,
+                           help='how many keys --trace keeps, default is 65536')
+    my_parser.add_argument('--raw', action='store_true',
+                           help='take keys as they are typed, without Enter after each one, e.g. "3 e 4+sin"')
+    my_parser.add_argument('--refresh', metavar='RATE', type=float,
+                           help='draw the display from a separate thread, at most RATE frames a second,\n'
+                                'dropping frames that keys overtake')
+    my_parser.add_argument('-p', '--plain', action='store_true',
+                           help='print the whole calculator after every key instead of updating the display in place')
     my_parser.epilog = epi_text
     args = my_parser.parse_args()
+    engine = get_engine(args.engine)
+    if args.trace_size <= 0:
+        my_parser.error('--trace-size must be more than 0')
+
+    def start_trace():
+        # Set here as well as by install(), which sets it in 'import hp35',
+        # a different module from this one when run as 'python3 hp35.py'
+        global tracer
+        if args.trace is not None:
+            import hp35trace
+            tracer = hp35trace.Tracer(args.trace, args.trace_size)
+            hp35trace.install(tracer)
+
+    def chosen_registers():
+        # --registers for --keys, --script and --npy
+        registers = args.registers.upper()
+        if not registers or any(reg not in 'XYZTM' for reg in registers):
+            my_parser.error('--registers must be made up of X, Y, Z, T and M')
+        return registers
+
+    if args.keys is not None or args.script is not None:
+        registers = chosen_registers()
+        if args.script == '-':
+            text = sys.stdin.read()
+        elif args.script is not None:
+            try:
+                with open(args.script) as f:
+                    text = f.read()
+            except OSError as err:
+                my_parser.error(str(err))
+        else:
+            text = ''
+        if args.keys is not None:
+            text = text + '\n' + args.keys
+        start_trace()
+        sys.exit(run_script(text, registers, engine))
+    if args.program is not None:
+        import hp35filter
+        sys.exit(hp35filter.run_filter(args.program, reply=args.reply, engine=engine))
+    if args.batch is not None:
+        if args.format == 'led':
+            my_parser.error('--batch --format must be csv or jsonl')
+        import hp35batch
+        sys.exit(hp35batch.batch(args.batch, args.output, args.format, args.jobs, args.chunk_size or 1000,
+                                 args.cache))
+    if args.npy is not None:
+        registers = chosen_registers()
+        import hp35npy
+        sys.exit(hp35npy.npy(args.npy, args.column, args.output or 'hp35-', registers, args.chunk_size))
+    if args.solve is not None:
+        if args.bracket is None:
+            my_parser.error('--solve needs --bracket A B')
+        import hp35solve
+        methods = hp35solve.METHODS if args.method == 'all' else [args.method]
+        sys.exit(hp35solve.report(args.solve, args.bracket[0], args.bracket[1], methods, engine))
+    if args.tabulate is not None:
+        if args.x is None:
+            my_parser.error('--tabulate needs --x START:STOP:STEP')
+        if args.format == 'jsonl':
+            my_parser.error('--tabulate --format must be csv or led')
+        import hp35table
+        sys.exit(hp35table.tabulate(args.tabulate, args.x, args.y, args.format or 'csv', engine=engine,
+                                    jobs=args.jobs, chunk_size=args.chunk_size))
+    if args.serve is not None:
+        import hp35serve
+        start_trace()
+        sys.exit(hp35serve.serve(args.serve, args.reply, args.max_sessions))
     verbose = args.quiet
     colour = str(args.display)
     disp_col = hpdata.colours[colour]
-    # Create operational stack as a Python dictionary
-    stack = {"T": 0.0,
-             "Z": 0.0,
-             "Y": 0.0,
-             "X": 0.0}
-    # Clear everything on startup
-    stack = clear_stack(stack)
-    mem = float(0.0)
+    # Create the operational stack and memory, cleared on startup
+    if args.history < 0:
+        my_parser.error('--history must be 0 or more')
+    calculator = Calculator(engine, args.history)
+    journal = None
+    if args.journal or args.resume:
+        import hp35journal
+        path = args.journal or hp35journal.DEFAULT_PATH
+        try:
+            if args.resume:
+                calculator.stack, replayed = hp35journal.resume(path, engine)
+            journal = hp35journal.Journal(path, calculator.stack)
+        except (OSError, hp35journal.JournalError) as err:
+            my_parser.error(str(err))
+    stack = calculator.stack
+    start_trace()
+    renderer = make_renderer(disp_col, verbose, args.plain)
+    threaded = None
+    if args.refresh is not None:
+        if not args.refresh > 0.0:
+            my_parser.error('--refresh must be more than 0')
+        import hp35render
+        renderer = threaded = hp35render.ThreadedRenderer(renderer, args.refresh)
+    reader = None
+    if args.raw:
+        import hp35keys
+        reader = hp35keys.KeyReader()
+        reader.__enter__()
+    profiler = None
+    if args.profile or args.profile_json:
+        import hp35prof
+        profiler = hp35prof.Profiler()
+        renderer = hp35prof.ProfiledRenderer(renderer, profiler)
     try:
         chars = "0.             "
         a_number = True
-        show_calc(chars, disp_col, a_number, False)
-        if verbose:
-            display_registers(mem, stack)
+        if args.resume:
+            renderer.calc(engine.led_string(stack.X), False, False)
+        else:
+            renderer.calc(chars, a_number, False)
+        renderer.registers(stack)
         cmd = ''
+        deferred = []
+
+        def prompt():
+            # Draw what was put off while keys were waiting, then prompt
+            if deferred:
+                renderer.calc(*deferred.pop())
+                renderer.registers(stack)
+            renderer.menu()
+
         while True:
-            display_key_menu()
-            cmd, a_number = get_cmd(cmd)
-            print()
+            if reader is None:
+                renderer.menu()
+                if profiler is not None:
+                    profiler.begin()
+                cmd, a_number = get_cmd(cmd)
+                print()
+            else:
+                if profiler is not None:
+                    profiler.begin()
+                cmd, a_number = reader.read_key(prompt, renderer.message)
+            if profiler is not None:
+                profiler.input_done()
             if not a_number:
-                cmd, stack, mem = process_action_keys(cmd, disp_col, stack, mem)
+                key = cmd
+                before = stack.values()
+                failed = False
+                if key == 'eex' and reader is not None:
+                    # The exponent is the next key typed, as in --keys
+                    try:
+                        exponent = parse_exponent([reader.token(prompt)])
+                    except ValueError as err:
+                        renderer.message(str(err))
+                        continue
+                    stack.X = engine.exponent_value(stack.X, exponent)
+                    if tracer is not None:
+                        tracer.record('eex', stack, False)
+                    calculator.history.record(before, stack)
+                    cmd = ''
+                elif key in ('off', 'on', 'eex'):
+                    # These need the terminal
+                    cmd = process_action_keys(cmd, renderer, stack, engine)
+                    calculator.history.record(before, stack)
+                else:
+                    result = calculator.press(key)
+                    if result.error is not None:
+                        renderer.message(result.error)
+                    cmd = 'wink' if result.winks else ''
+                    failed = result.error is not None
+                if profiler is not None:
+                    profiler.compute_done(key, cmd == 'wink')
+                if journal is not None:
+                    if failed:
+                        # Not replayable, but anything it changed is kept
+                        if stack.values() != before:
+                            journal.snapshot(stack)
+                    elif key in engine.dispatch:
+                        journal.key(key, stack)
+                    elif key == 'eex':
+                        journal.number(stack)
+                    elif key in hpdata.command_keys:
+                        # Any or all of the registers may have changed
+                        journal.snapshot(stack)
                 if cmd != 'wink':
-                    to_display = stack["X"]
-                    show_calc(to_display, disp_col, True, False)
+                    # Formatted by the engine, so it's passed on as text
+                    frame = (engine.led_string(stack.X), False, False)
                 else:
-                    show_calc(cmd, disp_col, False, False)
-                if verbose:
-                    display_registers(mem, stack)
+                    frame = (cmd, False, False)
             else:
-                lo = 0.01
-                hi = 1000000000.0
                 cmd = float(cmd)
-                in_range = lo < cmd < hi
-                if in_range:
-                    stack["X"] = float(cmd)
-                else:
-                    stack["X"] = float(np.format_float_scientific(float(cmd), exp_digits=2, unique=False, precision=9))
-                show_calc(cmd, disp_col, a_number, False)
-                if verbose:
-                    display_registers(mem, stack)
+                calculator.press(cmd)
+                if profiler is not None:
+                    profiler.compute_done('number', False)
+                if journal is not None:
+                    journal.number(stack)
+                frame = (cmd, a_number, False)
+            if reader is not None and reader.pending():
+                # More keys are waiting, so don't stop to draw this one
+                deferred[:] = [frame]
+                continue
+            del deferred[:]
+            renderer.calc(*frame)
+            renderer.registers(stack)
     except KeyboardInterrupt:
         print()
         print("Keyboard interrupt by user")
         print()
         print()
+    finally:
+        if threaded is not None:
+            threaded.close()
+        if profiler is not None:
+            if args.profile_json:
+                profiler.dump(args.profile_json)
+            else:
+                profiler.report()
+        if journal is not None:
+            journal.close(stack)
+        if reader is not None:
+            reader.__exit__(None, None, None)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --batch FILE': run a file of keystroke programs, each with its own
+# starting registers, across a pool of processes.
+#
+# Input is CSV, with a 'keys' column and optional X, Y, Z, T and M columns,
+# or JSON lines such as {"keys": "e x sin", "X": 30}. Every record is run
+# through hp35.replay_keys() on its own Registers, so results don't depend
+# on how records are split up, and they're written in input order. A record
+# that winks or has a bad key is reported in its result row; the rest of the
+# batch carries on.
+#
+# With a cache (--cache FILE), records are looked up in this process before
+# any work is sent out, and only the misses go to the pool. Their results
+# are added to the cache as they come back.
+#
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import hp35
+import hp35cache
+
+REGISTERS = 'XYZTM'
+
+
+def read_records(f, form):
+    #
+    # (line number, record) pairs, where a record is a dictionary, or the
+    # error message if the line can't be read
+    #
+    if form == 'csv':
+        for number, row in enumerate(csv.DictReader(f), 1):
+            yield number, row
+    else:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as err:
+                record = 'bad JSON: ' + str(err)
+            else:
+                if not isinstance(record, dict):
+                    record = 'not a JSON object'
+            yield number, record
+
+
+def record_input(record):
+    # The tokens and starting register values of a record
+    return (hp35.parse_keys(str(record.get('keys') or '')),
+            [float(record.get(reg) or 0.0) for reg in REGISTERS])
+
+
+def record_key(record):
+    # The record's cache key, or None if it can't be read
+    if isinstance(record, str):
+        return None
+    try:
+        return hp35cache.cache_key(*record_input(record))
+    except (TypeError, ValueError):
+        return None
+
+
+def run_record(number, record):
+    result = collections.OrderedDict([('line', number)])
+    result.update((reg, None) for reg in REGISTERS)
+    result['wink'] = []
+    result['error'] = None
+    if isinstance(record, str):
+        result['error'] = record
+        return result
+    try:
+        tokens, values = record_input(record)
+        stack = hp35.Registers(*values)
+        winks = hp35.replay_keys(tokens, stack)
+    except (TypeError, ValueError) as err:
+        result['error'] = str(err)
+        return result
+    for reg in REGISTERS:
+        result[reg] = getattr(stack, reg)
+    # Steps are counted from 1, as in the --keys wink messages
+    result['wink'] = [[step + 1, key] for step, key in winks]
+    return result
+
+
+def run_chunk(chunk):
+    return [run_record(number, record) for number, record in chunk]
+
+
+def cached_result(number, value):
+    # A result row from a cache value, as run_record() would have made it
+    result = collections.OrderedDict([('line', number)])
+    result.update(zip(REGISTERS, value[:5]))
+    result['wink'] = [[step + 1, key] for step, key in value[5]]
+    result['error'] = value[6]
+    return result
+
+
+def cache_value(result):
+    return [result[reg] for reg in REGISTERS] + [[[step - 1, key] for step, key in result['wink']], result['error']]
+
+
+class Work:
+    #
+    # A chunk on its way through run_batch(): the results already known from
+    # the cache, by position, and the records left to run
+    #
+    def __init__(self, chunk, cache):
+        self.size = len(chunk)
+        self.known = {}
+        self.keys = []
+        self.misses = []
+        for position, (number, record) in enumerate(chunk):
+            key = record_key(record) if cache is not None else None
+            value = cache.get(key) if key is not None else None
+            if value is not None:
+                self.known[position] = cached_result(number, value)
+            else:
+                self.keys.append(key)
+                self.misses.append((number, record))
+
+    def results(self, results, cache):
+        results = iter(results)
+        keys = iter(self.keys)
+        for position in range(self.size):
+            if position in self.known:
+                yield self.known[position]
+                continue
+            result = next(results)
+            key = next(keys)
+            if key is not None:
+                cache.put(key, cache_value(result))
+            yield result
+
+
+def run_batch(records, jobs=None, chunk_size=1000, cache=None):
+    #
+    # Results in input order. Only a few chunks per process are in flight
+    # at once, so memory stays flat however big the input is.
+    #
+    chunks = iter(lambda: list(itertools.islice(records, chunk_size)), [])
+    if jobs == 1:
+        for chunk in chunks:
+            work = Work(chunk, cache)
+            for result in work.results(run_chunk(work.misses), cache):
+                yield result
+        return
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            work = Work(chunk, cache)
+            pending.append((work, executor.submit(run_chunk, work.misses)))
+            if len(pending) >= 2 * (jobs or os.cpu_count() or 1):
+                work, future = pending.popleft()
+                for result in work.results(future.result(), cache):
+                    yield result
+        while pending:
+            work, future = pending.popleft()
+            for result in work.results(future.result(), cache):
+                yield result
+
+
+def write_results(results, f, form):
+    if form == 'csv':
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['line'] + list(REGISTERS) + ['wink', 'error'])
+        for result in results:
+            wink = ' '.join(str(step) + ':' + key for step, key in result['wink'])
+            writer.writerow([result['line']] + [result[reg] for reg in REGISTERS] + [wink, result['error'] or ''])
+    else:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+
+
+def batch(path, output=None, form=None, jobs=None, chunk_size=1000, cache_path=None):
+    if form is None:
+        form = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    with contextlib.ExitStack() as files:
+        try:
+            f = sys.stdin if path == '-' else files.enter_context(open(path, newline=''))
+            out = sys.stdout if output in (None, '-') else files.enter_context(open(output, 'w', newline=''))
+            cache = None
+            if cache_path is not None:
+                cache = hp35cache.ResultCache(cache_path)
+                files.callback(cache.close)
+        except (OSError, sqlite3.Error) as err:
+            print('hp35:', err, file=sys.stderr)
+            return 1
+        write_results(run_batch(read_records(f, form), jobs, chunk_size, cache), out, form)
+        if cache is not None:
+            print('hp35: cache', ', '.join(name + ' ' + str(value) for name, value in cache.stats().items()),
+                  file=sys.stderr)
+    return 0
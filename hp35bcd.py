@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# A decimal engine for the HP-35, closer to how the real one worked. Each
+# register holds a Number: a signed 10 digit integer mantissa and a decimal
+# exponent, so 1234.5 is Number(1234500000, 3) and means 1.2345 x 10³.
+#
+# +, -, x, ÷, 1/x and √x are done in integers and rounded to 10 significant
+# digits, half away from zero, with nothing lost on the way. The other
+# functions go through a float and the result is rounded back to 10 digits,
+# which is as far as a float can be trusted anyway. Results past 9.999999999
+# x 10⁹⁹ stick there and anything below 10⁻⁹⁹ becomes 0, as on the HP-35.
+#
+# The LED display is copied straight from the mantissa digits.
+#
+# The float engine in hp35.py rounds to 9 decimal places rather than 10
+# significant digits, so the two engines can disagree, mostly on very small
+# numbers and on long fractions. benchmarks/engines.py reports where.
+#
+import collections
+import math
+import hp35
+import hp35data as hpdata
+
+DIGITS = 10
+LOW = 10 ** (DIGITS - 1)
+HIGH = 10 ** DIGITS
+
+
+class Number(collections.namedtuple('Number', 'mantissa exponent')):
+    #
+    # mantissa x 10 ** (exponent - 9), with LOW <= |mantissa| < HIGH, or
+    # mantissa and exponent both 0 for zero
+    #
+    __slots__ = ()
+
+    def __float__(self):
+        return float(str(self.mantissa) + 'e' + str(self.exponent - DIGITS + 1))
+
+    def __str__(self):
+        # The same as the float engine prints, since a float holds 10 digits exactly
+        return repr(float(self))
+
+    def __neg__(self):
+        return Number(-self.mantissa, self.exponent)
+
+    def __abs__(self):
+        return Number(abs(self.mantissa), self.exponent)
+
+
+ZERO = Number(0, 0)
+ONE = Number(LOW, 0)
+HP35_MAX = Number(HIGH - 1, 99)
+
+
+def pack(coefficient, exponent):
+    #
+    # coefficient x 10 ** exponent, for any integer coefficient, rounded to a
+    # Number
+    #
+    if not coefficient:
+        return ZERO
+    negative = coefficient < 0
+    coefficient = abs(coefficient)
+    extra = len(str(coefficient)) - DIGITS
+    if extra > 0:
+        scale = 10 ** extra
+        coefficient, rest = divmod(coefficient, scale)
+        if 2 * rest >= scale:
+            coefficient += 1
+            if coefficient == HIGH:
+                coefficient = LOW
+                extra += 1
+        exponent += extra
+    elif extra < 0:
+        coefficient *= 10 ** -extra
+        exponent += extra
+    exponent += DIGITS - 1
+    if exponent > 99:
+        return -HP35_MAX if negative else HP35_MAX
+    if exponent < -99:
+        return ZERO
+    return Number(-coefficient if negative else coefficient, exponent)
+
+
+def from_float(number):
+    #
+    # The float rounded to 10 significant digits. '%.9e' gives exactly those
+    # digits, correctly rounded.
+    #
+    if number == 0.0:
+        return ZERO
+    if number >= 1e100:
+        return HP35_MAX
+    if number <= -1e100:
+        return -HP35_MAX
+    mantissa, _, exponent = ('%.9e' % number).partition('e')
+    return pack(int(mantissa.replace('.', '')), int(exponent) - DIGITS + 1)
+
+
+def entry_value(number):
+    # A number as typed in
+    return from_float(float(number))
+
+
+def in_range(number):
+    #
+    # Shown without an exponent: 0.01 < |number| < 10⁹
+    #
+    mantissa = abs(number.mantissa)
+    return number.exponent < 9 and (number.exponent > -2 or (number.exponent == -2 and mantissa > LOW))
+
+
+def exponent_value(number, exponent):
+    #
+    # What X becomes when an exponent is keyed in, as hp35.exponent_value()
+    #
+    if not number.mantissa:
+        return pack(1, exponent)
+    if in_range(number):
+        return pack(number.mantissa, number.exponent - DIGITS + 1 + exponent)
+    return pack(number.mantissa, exponent - DIGITS + 1)
+
+
+def led_string(number):
+    #
+    # The 15 character LED string, copied from the digits. It follows the
+    # same rules as hp35.format_led().
+    #
+    mantissa, exponent = number
+    if not mantissa:
+        return '0.             '
+    sign = '-' if mantissa < 0 else ''
+    mantissa = abs(mantissa)
+    digits = str(mantissa)
+    if -2 < exponent < 9 or (exponent == -2 and mantissa > LOW):
+        if exponent >= 0:
+            text = digits[:exponent + 1] + '.' + digits[exponent + 1:].rstrip('0')
+        else:
+            text = '0.' + '0' * (-exponent - 1) + digits.rstrip('0')
+        return (sign + text).ljust(15)
+    big = exponent >= 9
+    return ((sign or ' ') + (digits[0] + '.' + digits[1:].rstrip('0')).ljust(11) + (' ' if big else '-') +
+            '%02d' % abs(exponent))
+
+
+def add_numbers(a, b):
+    if not a.mantissa:
+        return b
+    if not b.mantissa:
+        return a
+    if a.exponent < b.exponent:
+        a, b = b, a
+    shift = a.exponent - b.exponent
+    if shift > DIGITS + 1:
+        # b is too small to change a
+        return a
+    return pack(a.mantissa * 10 ** shift + b.mantissa, b.exponent - DIGITS + 1)
+
+
+def add(stack):
+    stack.X = add_numbers(stack.Y, stack.X)
+
+
+def subtract(stack):
+    stack.X = add_numbers(stack.Y, -stack.X)
+
+
+def multiply(stack):
+    stack.X = pack(stack.Y.mantissa * stack.X.mantissa, stack.Y.exponent + stack.X.exponent - 2 * (DIGITS - 1))
+
+
+def divide_numbers(a, b):
+    #
+    # Two digits more than needed are enough, since rounding half away from
+    # zero only looks at the first digit dropped
+    #
+    quotient = abs(a.mantissa) * 10 ** (DIGITS + 1) // abs(b.mantissa)
+    if (a.mantissa < 0) != (b.mantissa < 0):
+        quotient = -quotient
+    return pack(quotient, a.exponent - b.exponent - DIGITS - 1)
+
+
+def divide(stack):
+    if not stack.X.mantissa:
+        stack.X = ZERO
+        return True
+    stack.X = divide_numbers(stack.Y, stack.X)
+    return False
+
+
+def reciprocal(stack):
+    if not stack.X.mantissa:
+        stack.X = ZERO
+        return True
+    stack.X = divide_numbers(ONE, stack.X)
+    return False
+
+
+def isqrt(n):
+    # math.isqrt() is only in Python 3.8 and later
+    if n < 2:
+        return n
+    root = 1 << ((n.bit_length() + 1) // 2)
+    while True:
+        smaller = (root + n // root) // 2
+        if smaller >= root:
+            return root
+        root = smaller
+
+
+def square_root(stack):
+    #
+    # Scale the mantissa up by 10¹³ or 10¹⁴ so the power of ten left over is
+    # even; the integer root then has 12 digits and the exponent halves exactly
+    #
+    number = stack.X
+    if number.mantissa < 0:
+        stack.X = ZERO
+        return True
+    if not number.mantissa:
+        return False
+    power = number.exponent - DIGITS + 1 - (DIGITS + 3)
+    if power % 2:
+        power -= 1
+    root = isqrt(number.mantissa * 10 ** (number.exponent - DIGITS + 1 - power))
+    stack.X = pack(root, power // 2)
+    return False
+
+
+def log(stack):
+    if stack.X.mantissa <= 0:
+        stack.X = ZERO
+        return True
+    stack.X = from_float(math.log10(float(stack.X)))
+    return False
+
+
+def ln(stack):
+    if stack.X.mantissa <= 0:
+        stack.X = ZERO
+        return True
+    stack.X = from_float(math.log(float(stack.X)))
+    return False
+
+
+#
+# Exact results at multiples of 90°, where a float would leave something
+# like 1.2e-16 behind
+#
+right_angles = {'sin': (ZERO, ONE, ZERO, -ONE),
+                'cos': (ONE, ZERO, -ONE, ZERO),
+                'tan': (ZERO, HP35_MAX, ZERO, -HP35_MAX)}
+
+
+def trig(name, number):
+    degrees = float(number)
+    if abs(degrees) >= 360.0:
+        degrees %= 360.0
+    if degrees % 90.0 == 0.0:
+        return right_angles[name][int(degrees // 90.0)]
+    return from_float(getattr(math, name)(math.radians(degrees)))
+
+
+def sin(stack):
+    stack.X = trig('sin', stack.X)
+
+
+def cos(stack):
+    stack.X = trig('cos', stack.X)
+
+
+def tan(stack):
+    stack.X = trig('tan', stack.X)
+
+
+def arcsin(stack):
+    number = float(stack.X)
+    if not -1.0 <= number <= 1.0:
+        stack.X = ZERO
+        return True
+    stack.X = from_float(math.degrees(math.asin(number)))
+    return False
+
+
+def arccos(stack):
+    number = float(stack.X)
+    if not -1.0 <= number <= 1.0:
+        stack.X = ZERO
+        return True
+    stack.X = from_float(math.degrees(math.acos(number)))
+    return False
+
+
+def arctan(stack):
+    stack.X = from_float(math.degrees(math.atan(float(stack.X))))
+
+
+def exp(stack):
+    #
+    # x^y: X to the power Y, as in hp35.exp()
+    #
+    if stack.X.mantissa < 0:
+        stack.X = ZERO
+        return True
+    try:
+        stack.X = from_float(math.pow(float(stack.X), float(stack.Y)))
+    except OverflowError:
+        stack.X = ZERO
+        return True
+    return False
+
+
+def ex(stack):
+    try:
+        stack.X = from_float(math.exp(float(stack.X)))
+    except OverflowError:
+        stack.X = ZERO
+        return True
+    return False
+
+
+def clear_x(stack):
+    stack.X = ZERO
+
+
+def change_sign(stack):
+    stack.X = -stack.X
+
+
+def clear(stack):
+    for reg in stack.__slots__:
+        setattr(stack, reg, ZERO)
+
+
+#
+# Key -> handler from the table in hp35data, using the Number version of an
+# op and the Registers stack moves, which don't care what they move
+#
+dispatch = {key: globals().get(spec.handler) or hp35.key_handler(spec.handler)
+            for key, spec in hpdata.key_table.items() if spec.handler}
+
+engine = hp35.Engine('bcd', dispatch, entry_value, exponent_value, led_string, from_float, ZERO)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# A cache of keystroke program results. Every key is a pure function of the
+# registers, so a program run on the same starting registers always ends
+# the same way, and the result can be kept and handed back next time.
+#
+# There are two tiers: a bounded LRU dictionary in memory, and optionally an
+# sqlite file that outlives the process. The file holds at most max_rows
+# results; past that the least recently used are dropped. It's stamped with
+# the engine name and hp35.ARITHMETIC_VERSION, and emptied when opened by
+# any other engine or arithmetic, so a change to the arithmetic can't serve
+# stale results.
+#
+import collections
+import json
+import sqlite3
+import hp35
+
+COMMIT_EVERY = 1000
+
+
+def version(engine):
+    return engine.name + ' arithmetic ' + str(hp35.ARITHMETIC_VERSION)
+
+
+def cache_key(tokens, values):
+    #
+    # repr() of a float is exact, so equal keys mean equal inputs
+    #
+    return ' '.join(tokens) + '|' + ' '.join(repr(float(value)) for value in values)
+
+
+class ResultCache:
+    def __init__(self, path=None, maxsize=4096, max_rows=1000000, engine=None):
+        self.engine = engine or hp35.float_engine
+        self.maxsize = maxsize
+        self.max_rows = max_rows
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if path is not None:
+            self.open(path)
+
+    def open(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, used INTEGER)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != version(self.engine):
+            self.db.execute('DELETE FROM results')
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version(self.engine),))
+        self.db.commit()
+        self.rows = self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        self.used = self.db.execute('SELECT COALESCE(MAX(used), 0) FROM results').fetchone()[0]
+        self.pending = 0
+
+    def get(self, key):
+        #
+        # The cached value, or None. A value is a list of the five final
+        # registers (X, Y, Z, T, M), the (step, key) pairs that winked and
+        # an error message or None.
+        #
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.db is not None:
+            row = self.db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.used += 1
+                self.db.execute('UPDATE results SET used = ? WHERE key = ?', (self.used, key))
+                self.written()
+                value = json.loads(row[0])
+                self.remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.remember(key, value)
+        if self.db is not None:
+            self.used += 1
+            text = json.dumps(value)
+            if self.db.execute('INSERT OR IGNORE INTO results VALUES (?, ?, ?)', (key, text, self.used)).rowcount:
+                self.rows += 1
+            else:
+                self.db.execute('UPDATE results SET value = ?, used = ? WHERE key = ?', (text, self.used, key))
+            self.written()
+
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def written(self):
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.evict()
+            self.db.commit()
+            self.pending = 0
+
+    def evict(self):
+        #
+        # Down to 90% of max_rows, so this doesn't happen on every commit
+        #
+        if self.rows <= self.max_rows:
+            return
+        drop = self.rows - self.max_rows * 9 // 10
+        self.db.execute('DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used LIMIT ?)', (drop,))
+        self.rows -= drop
+        self.evictions += drop
+
+    def stats(self):
+        stats = collections.OrderedDict([('hits', self.hits), ('disk_hits', self.disk_hits),
+                                         ('misses', self.misses), ('evictions', self.evictions),
+                                         ('memory', len(self.memory))])
+        if self.db is not None:
+            stats['disk'] = self.rows
+        return stats
+
+    def close(self):
+        if self.db is not None:
+            self.evict()
+            self.db.commit()
+            self.db.close()
+            self.db = None
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Compile a keystroke sequence once into a Python function that can be run
+# over and over on different registers. Handlers are looked up ahead of time,
+# anything that only depends on numbers keyed into the program (pi, literals,
+# clx, ...) is worked out at compile time, and stack moves whose results are
+# never seen are dropped. The compiled function gives exactly the registers
+# and winks that hp35.replay_keys() does for the same keys.
+#
+import hp35
+import hp35data as hpdata
+
+#
+# The registers each stack move reads and writes. The op functions read X,
+# or X and Y if they take two arguments, and write X.
+#
+moves = {'lift': ('XYZ', 'YZT'),
+         'roll': ('XYZT', 'XYZT'),
+         'swap': ('XY', 'XY'),
+         'store': ('X', 'M'),
+         'recall': ('M', 'X'),
+         'clear': ('', 'XYZTM'),
+         'clear_x': ('', 'X')}
+#
+# Handlers that can't raise for any registers, inf and nan included (some
+# of them wink instead), so a step using one that doesn't wink can be
+# dropped when nothing sees its result. sin, cos and tan raise ValueError
+# on inf, and xy on 0 to a negative power, as replay_keys() does.
+#
+total = set(moves) | {'add', 'subtract', 'multiply', 'divide', 'reciprocal', 'square_root', 'log', 'ln',
+                      'arcsin', 'arccos', 'arctan', 'ex', 'change_sign', 'exponent'}
+
+
+class Step:
+    #
+    # One step of a compiled program: a handler to call (None when it just
+    # loads constants), the registers it reads and writes, and the constants
+    # to load first.
+    #
+    def __init__(self, handler, reads, writes, winks, position, key, constants=None):
+        self.handler = handler
+        self.reads = reads
+        self.writes = writes
+        self.winks = winks
+        self.position = position
+        self.key = key
+        self.constants = constants or {}
+
+
+class Program:
+    #
+    # A compiled keystroke sequence. Call it with an hp35.Registers to run it
+    # in place; it returns True if any step winked. can_wink lists the
+    # (position, key) steps that might wink and can_raise those that might
+    # raise ArithmeticError or ValueError (sin of inf, 0 to a negative
+    # power, ...); can_fail is both, in order. When can_fail is empty the
+    # program always runs to the end without winking, so callers can skip
+    # checking.
+    #
+    def __init__(self, tokens, steps):
+        self.tokens = tokens
+        self.steps = steps
+        self.can_wink = [(step.position, step.key) for step in steps if step.winks]
+        self.can_raise = [(step.position, step.key) for step in steps if step.handler and can_raise(step)]
+        self.can_fail = sorted(set(self.can_wink + self.can_raise))
+        self.source, self.function = generate(steps)
+
+    def __call__(self, stack):
+        return self.function(stack)
+
+    def __repr__(self):
+        return 'Program(' + repr(' '.join(self.tokens)) + ')'
+
+
+def reads_writes(spec):
+    if spec.handler in moves:
+        return moves[spec.handler]
+    return 'XY'[:spec.arity], 'X'
+
+
+def scratch(known):
+    stack = hp35.Registers()
+    for reg, value in known.items():
+        if value is not None:
+            setattr(stack, reg, value)
+    return stack
+
+
+def evaluate(function, known):
+    #
+    # Try a step on the known values. It's only folded if it neither winks
+    # nor raises, so those still happen when the program runs.
+    #
+    stack = scratch(known)
+    try:
+        if function(stack):
+            return None
+    except (ArithmeticError, ValueError):
+        return None
+    return {reg: getattr(stack, reg) for reg in 'XYZTM'}
+
+
+def exponent_handler(exponent):
+    def handler(stack):
+        stack.X = hp35.exponent_value(stack.X, exponent)
+    return handler
+
+
+def fold(tokens):
+    #
+    # Walk the keys keeping track of which registers hold values known at
+    # compile time ('known'), and which of those haven't been written to the
+    # real registers yet ('stale'). A step whose inputs are all known is
+    # worked out here; otherwise any stale inputs are loaded first and the
+    # step is kept.
+    #
+    known = {reg: None for reg in 'XYZTM'}
+    stale = set()
+    steps = []
+
+    def keep(function, reads, writes, winks, position, key, moved=None):
+        loads = {reg: known[reg] for reg in reads if reg in stale}
+        if loads:
+            steps.append(Step(None, '', ''.join(loads), False, position, key, loads))
+            stale.difference_update(loads)
+        steps.append(Step(function, reads, writes, winks, position, key))
+        stale.difference_update(writes)
+        for reg in writes:
+            known[reg] = moved[reg] if moved else None
+
+    position = 0
+    while position < len(tokens):
+        cmd = tokens[position]
+        if cmd == 'pi':
+            cmd = '3.141592654'
+        if hp35.is_number(cmd):
+            known['X'] = hp35.entry_value(cmd)
+            stale.add('X')
+        elif cmd == 'off':
+            break
+        elif cmd == 'eex':
+            exponent = hp35.parse_exponent(tokens[position + 1:position + 2])
+            if known['X'] is not None:
+                known['X'] = hp35.exponent_value(known['X'], exponent)
+                stale.add('X')
+            else:
+                keep(exponent_handler(exponent), 'X', 'X', False, position, cmd)
+            position += 1
+        elif cmd not in hpdata.key_table:
+            raise ValueError("Invalid entry '" + cmd + "'")
+        elif hpdata.key_table[cmd].handler:
+            spec = hpdata.key_table[cmd]
+            function = hp35.dispatch[cmd]
+            reads, writes = reads_writes(spec)
+            result = None
+            if all(known[reg] is not None for reg in reads):
+                result = evaluate(function, known)
+            if result is not None:
+                for reg in writes:
+                    known[reg] = result[reg]
+                    stale.add(reg)
+            elif spec.handler in moves:
+                # A stack move only shuffles what's known about the registers
+                stack = hp35.Registers(*(known[reg] for reg in 'XYZTM'))
+                function(stack)
+                moved = {reg: getattr(stack, reg) for reg in 'XYZTM'}
+                keep(function, reads, writes, False, position, cmd, moved)
+            else:
+                keep(function, reads, writes, spec.winks, position, cmd)
+        position += 1
+    if stale:
+        loads = {reg: known[reg] for reg in 'XYZTM' if reg in stale}
+        steps.append(Step(None, '', ''.join(loads), False, len(tokens), 'end', loads))
+    return steps
+
+
+def cancel(steps):
+    #
+    # Stack moves that undo each other: x⇆y twice, or R↓ four times in a row
+    #
+    result = []
+    for step in steps:
+        result.append(step)
+        if not step.handler:
+            continue
+        if step.key == 'rv' and len(result) >= 2 and result[-2].key == 'rv' and result[-2].handler:
+            del result[-2:]
+        elif step.key == 'rd' and len(result) >= 4 and all(s.key == 'rd' and s.handler for s in result[-4:]):
+            del result[-4:]
+    return result
+
+
+def can_raise(step):
+    # An 'eex' step is the exponent handler
+    name = 'exponent' if step.key == 'eex' else hpdata.key_table[step.key].handler
+    return name not in total
+
+
+def prune(steps):
+    #
+    # Work back from the end, where every register can be seen, dropping
+    # steps whose results are all overwritten before anything reads them.
+    # Steps that might wink, or might raise, are always kept.
+    #
+    live = set('XYZTM')
+    result = []
+    for step in reversed(steps):
+        if step.handler is None:
+            loads = {reg: value for reg, value in step.constants.items() if reg in live}
+            if loads:
+                result.append(Step(None, '', ''.join(loads), False, step.position, step.key, loads))
+                live.difference_update(loads)
+            continue
+        if not step.winks and not can_raise(step) and not live.intersection(step.writes):
+            continue
+        result.append(step)
+        live.difference_update(step.writes)
+        live.update(step.reads)
+    result.reverse()
+    return result
+
+
+def generate(steps):
+    #
+    # Straight-line Python source for the steps, compiled into a function.
+    # Only the steps that can wink have their result checked.
+    #
+    namespace = {}
+    lines = ['def program(stack):', '    wink = False']
+    for number, step in enumerate(steps):
+        if step.handler is None:
+            for reg, value in step.constants.items():
+                lines.append('    stack.' + reg + ' = ' + repr(value))
+            continue
+        name = 'step_' + str(number)
+        namespace[name] = step.handler
+        if step.winks:
+            lines.append('    if ' + name + '(stack):')
+            lines.append('        wink = True')
+        else:
+            lines.append('    ' + name + '(stack)')
+    lines.append('    return wink')
+    source = '\n'.join(lines) + '\n'
+    namespace['inf'] = float('inf')
+    namespace['nan'] = float('nan')
+    exec(compile(source, '<hp35 program>', 'exec'), namespace)
+    return source, namespace['program']
+
+
+def compile_keys(tokens):
+    #
+    # Compile a keystroke sequence, either a string such as "e x 2 / sin" or a
+    # list of tokens, into a Program
+    #
+    if isinstance(tokens, str):
+        tokens = hp35.parse_keys(tokens)
+    tokens = list(tokens)
+    return Program(tokens, prune(cancel(fold(tokens))))
+
+
+def make_runner(tokens, engine):
+    #
+    # A function from a list of starting values (X first) to the final
+    # registers and whether anything winked, for --program, --solve and
+    # --tabulate. The float engine runs the compiled program; compiling
+    # checks the keys, whichever engine runs them.
+    #
+    program = compile_keys(tokens)
+    if engine is hp35.float_engine:
+        function = program.function
+
+        def run(values):
+            stack = hp35.Registers(*values)
+            return stack, function(stack)
+    else:
+        def run(values):
+            stack = engine.registers()
+            for reg, value in zip('XYZTM', values):
+                setattr(stack, reg, engine.from_float(value))
+            return stack, bool(hp35.replay_keys(tokens, stack, engine))
+    return run
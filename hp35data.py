@@ -1,15 +1,86 @@
 #!/usr/bin/python3
 # -*- coding: utf-8 -*-
 
-key_list = ['off', 'on',
-            'xy', 'log', 'ln', 'ex', 'clr',
-            'rx', 'as', 'ac', 'at', 'sin', 'cos', 'tan',
-            '1x', 'rv', 'rd', 'sto', 'rcl',
-            'e', 'chs', 'eex', 'clx',
-            '-', '7', '8', '9',
-            '+', '4', '5', '6',
-            'x', '1', '2', '3',
-            '/', '0', '.', 'pi', ]
+from collections import namedtuple
+
+#
+# What each key does: the function that carries it out (an op function in
+# hp35, or failing that a Registers method), how many registers it reads
+# and whether it can wink. Keys with no handler ('off', 'on', 'eex', the
+# digits, '.' and 'pi') are dealt with by whatever is driving the
+# calculator. Adding a key is one entry here.
+#
+KeySpec = namedtuple('KeySpec', ['handler', 'arity', 'winks'])
+no_op = KeySpec(None, 0, False)
+key_table = {'off': no_op, 'on': no_op,
+             'xy': KeySpec('exp', 2, True),
+             'log': KeySpec('log', 1, True),
+             'ln': KeySpec('ln', 1, True),
+             'ex': KeySpec('ex', 1, True),
+             'clr': KeySpec('clear', 0, False),
+             'rx': KeySpec('square_root', 1, True),
+             'as': KeySpec('arcsin', 1, True),
+             'ac': KeySpec('arccos', 1, True),
+             'at': KeySpec('arctan', 1, False),
+             'sin': KeySpec('sin', 1, False),
+             'cos': KeySpec('cos', 1, False),
+             'tan': KeySpec('tan', 1, False),
+             '1x': KeySpec('reciprocal', 1, True),
+             'rv': KeySpec('swap', 2, False),
+             'rd': KeySpec('roll', 4, False),
+             'sto': KeySpec('store', 1, False),
+             'rcl': KeySpec('recall', 0, False),
+             'e': KeySpec('lift', 3, False),
+             'chs': KeySpec('change_sign', 1, False),
+             'eex': no_op,
+             'clx': KeySpec('clear_x', 0, False),
+             '-': KeySpec('subtract', 2, False),
+             '7': no_op, '8': no_op, '9': no_op,
+             '+': KeySpec('add', 2, False),
+             '4': no_op, '5': no_op, '6': no_op,
+             'x': KeySpec('multiply', 2, True),
+             '1': no_op, '2': no_op, '3': no_op,
+             '/': KeySpec('divide', 2, True),
+             '0': no_op, '.': no_op, 'pi': no_op}
+#
+# Keys the HP-35 never had. They step through the session's history rather
+# than work on the registers, so they can't go in a program.
+#
+command_keys = ['undo', 'redo']
 eex_list = ['-', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '\n']
 colours = {'W': 'white', 'G': 'green', 'Y': 'yellow',
            'R': 'red', 'B': 'blue', 'M': 'magenta', 'C': 'cyan'}
+#
+# The calculator body below the OFF/ON switch, and the key menu shown beside it
+#
+switch_off = '|   OFF═ ON                            |'
+switch_on = '|   OFF ═ON                            |'
+keyboard = ['|                                      |',
+            '|   Xʸ     log    ln      eˣ    CLR    |',
+            '|                                      |',
+            '|   √x     arc    sin    cos    tan    |',
+            '|                                      |',
+            '|   1/x    x⇆y    R↓     STO    RCL    |',
+            '|                                      |',
+            '|   ENTER↑       CHS    E EX   CL x    |',
+            '|                                      |',
+            '|     -      7        8        9       |',
+            '|                                      |',
+            '|     +      4        5        6       |',
+            '|                                      |',
+            '|     X      1        2        3       |',
+            '|                                      |',
+            '|     ÷      0        ·        𝛑       |',
+            '|                                      |',
+            '|______________________________________|',
+            '|  h/p  H E W L E T T - P A C K A R D  |',
+            '└--------------------------------------┘']
+key_menu = ['off  on                undo redo',
+            'xy     log     ln   ex   clr',
+            'rx  a<s,c,t>   sin  cos  tan',
+            '1x      rv     rd   sto  rcl',
+            'e(nter)        chs  eex  clx',
+            '-        7       8       9',
+            '+        4       5       6',
+            'x        1       2       3',
+            '/        0       .      pi']
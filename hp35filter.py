@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --program KEYS': a Unix filter. Each line of input holds up to four
+# numbers, separated by spaces or commas, which go into X, Y, Z and T. The
+# program is run on them and X comes out, as the LED display shows it or as
+# the number itself with --reply x, one line out for each line in.
+#
+# A line that winked starts with 'wink ', and one that can't be read gets
+# 'error ...' so the output still lines up with the input. Blank lines pass
+# through as they are. Lines are read, worked out and written one at a time,
+# so memory use doesn't depend on the size of the input.
+#
+import os
+import sys
+import hp35
+import hp35compile
+
+REGISTERS = 'XYZT'
+
+
+def read_rows(lines):
+    #
+    # (values, None) for each line, or (None, error) if it can't be read;
+    # (None, None) for a blank line
+    #
+    for line in lines:
+        fields = line.replace(',', ' ').split()
+        if not fields:
+            yield None, None
+        elif len(fields) > len(REGISTERS):
+            yield None, 'more than ' + str(len(REGISTERS)) + ' numbers'
+        else:
+            try:
+                yield [float(field) for field in fields], None
+            except ValueError:
+                yield None, 'not a number: ' + line.strip()
+
+
+def results(rows, run, engine, reply):
+    for values, error in rows:
+        if error is not None:
+            yield 'error ' + error + '\n'
+            continue
+        if values is None:
+            yield '\n'
+            continue
+        try:
+            stack, wink = run(values)
+        except (ArithmeticError, ValueError) as err:
+            yield 'error ' + str(err) + '\n'
+            continue
+        if reply == 'x':
+            text = str(stack.X)
+        else:
+            text = engine.led_string(stack.X).rstrip()
+        yield ('wink ' + text if wink else text) + '\n'
+
+
+def run_filter(keys, f=None, out=None, reply='led', engine=None):
+    engine = engine or hp35.float_engine
+    f = f or sys.stdin
+    out = out or sys.stdout
+    tokens = hp35.parse_keys(keys)
+    try:
+        run = hp35compile.make_runner(tokens, engine)
+    except ValueError as err:
+        print('hp35:', err, file=sys.stderr)
+        return 2
+    try:
+        out.writelines(results(read_rows(f), run, engine, reply))
+        out.flush()
+    except BrokenPipeError:
+        # The reader went away, e.g. 'hp35 --program ... | head'. Point
+        # stdout at /dev/null so Python doesn't complain on the way out.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+    return 0
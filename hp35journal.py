@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --journal FILE' and 'hp35 --resume': an append-only record of an
+# interactive session, so the registers survive 'off', a crash or a closed
+# terminal.
+#
+# The journal is a run of 16 byte records: a kind byte, a 7 byte key and a
+# double. Every key that changes the registers adds a 'K' record holding
+# the key and the X it left. A number keyed in, or an exponent, adds an 'N'
+# record holding the new X. Every so often, and at the start and end of a
+# session, a snapshot of the registers goes in as five records, one each
+# for X, Y, Z, T and M.
+#
+# Resuming reads the journal through mmap from the end: it steps back to
+# the last complete snapshot and replays only the records after it, so it
+# takes the same time however long the journal has grown. A record cut
+# short by a crash is dropped, and so is a key that raises on the way, which
+# an older journal could hold.
+#
+import mmap
+import os
+import struct
+import hp35
+
+RECORD = struct.Struct('<c7sd')
+HEADER = RECORD.pack(b'H', b'hp35j1', 0.0)
+SNAPSHOT = b'XYZTM'
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.hp35.journal')
+
+
+class JournalError(Exception):
+    pass
+
+
+class Journal:
+    def __init__(self, path, stack, snapshot_every=256):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.since_snapshot = 0
+        self.f = open_journal(path)
+        self.snapshot(stack)
+
+    def write(self, kind, key, value):
+        self.f.write(RECORD.pack(kind, key.encode('ascii'), float(value)))
+
+    def key(self, cmd, stack):
+        # A key the engine handled, and the X it left
+        self.write(b'K', cmd, stack.X)
+        self.written(stack)
+
+    def number(self, stack):
+        # A number or an exponent keyed into X
+        self.write(b'N', '', stack.X)
+        self.written(stack)
+
+    def written(self, stack):
+        self.since_snapshot += 1
+        if self.since_snapshot >= self.snapshot_every:
+            self.snapshot(stack)
+
+    def snapshot(self, stack):
+        # One write, so the five records go to the file together
+        self.f.write(b''.join(RECORD.pack(reg.encode(), b'snap', float(getattr(stack, reg)))
+                              for reg in SNAPSHOT.decode()))
+        self.since_snapshot = 0
+
+    def close(self, stack):
+        self.snapshot(stack)
+        self.f.close()
+
+
+def open_journal(path):
+    #
+    # Opened for appending, unbuffered, so every record is in the file as
+    # soon as it's written. A part record left at the end by a crash is cut
+    # off first.
+    #
+    f = open(path, 'ab', buffering=0)
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        f.write(HEADER)
+    elif size % RECORD.size:
+        f.truncate(size - size % RECORD.size)
+    return f
+
+
+def records(mm, first, last):
+    for offset in range(first * RECORD.size, last * RECORD.size, RECORD.size):
+        kind, key, value = RECORD.unpack_from(mm, offset)
+        yield kind, key.rstrip(b'\0').decode('ascii'), value
+
+
+def last_snapshot(mm, count):
+    #
+    # Index of the first record of the last complete snapshot, stepping back
+    # from the end
+    #
+    index = count - len(SNAPSHOT)
+    while index >= 1:
+        if all(mm[(index + i) * RECORD.size] == SNAPSHOT[i] for i in range(len(SNAPSHOT))):
+            return index
+        index -= 1
+    return None
+
+
+def resume(path, engine=None):
+    #
+    # The registers as the journal left them, and the number of records
+    # replayed after the last snapshot. An empty registers if there's no
+    # journal yet.
+    #
+    engine = engine or hp35.float_engine
+    stack = engine.registers()
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return stack, 0
+    with f:
+        count = os.fstat(f.fileno()).st_size // RECORD.size
+        if count == 0:
+            return stack, 0
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if mm[:RECORD.size] != HEADER:
+                raise JournalError(path + ' is not an hp35 journal')
+            start = last_snapshot(mm, count)
+            if start is None:
+                raise JournalError(path + ' has no snapshot to resume from')
+            for kind, key, value in records(mm, start, start + len(SNAPSHOT)):
+                setattr(stack, kind.decode(), engine.from_float(value))
+            replayed = 0
+            for kind, key, value in records(mm, start + len(SNAPSHOT), count):
+                if kind == b'K':
+                    # A key that can't be taken leaves the registers alone,
+                    # as it did when it was pressed
+                    before = stack.values()
+                    try:
+                        hp35.execute_key(key, stack, engine.dispatch)
+                    except (ArithmeticError, ValueError):
+                        hp35.History.restore(stack, before)
+                        continue
+                elif kind != b'N':
+                    continue
+                # X as it was recorded, so what was seen is what comes back
+                stack.X = engine.from_float(value)
+                replayed += 1
+        finally:
+            mm.close()
+    return stack, replayed
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --raw': read keys as they're typed, with no Enter after each one.
+#
+# The terminal is put in cbreak mode and everything typed (or pasted) is
+# read as it arrives and split into keys by KeyParser. A key ends at a
+# space or Enter, or as soon as the next character can't be part of it, so
+# '3 e 4+sin' is 3, ENTER↑, 4, + and sin. 'e', 'ex' and 'eex' share a start,
+# so 'e' needs a space after it, and '1x' is 1/x unless written '1 x'.
+# 'eex' takes the exponent that follows it, as in --keys: '1.5 eex -12'.
+# A number with two points, such as '3.1.4', is an invalid entry.
+#
+# Keys that arrive while others are still being worked on wait in the
+# parser, and the main loop only redraws the display once there are none
+# left, so a pasted calculation runs at the speed of the engine.
+#
+# When stdin isn't a terminal the same parser reads it as it is, so keys
+# can be piped in; the end of the input turns the calculator off.
+#
+import codecs
+import collections
+import os
+import select
+import sys
+import hp35
+import hp35data as hpdata
+
+SEPARATORS = ' \t\r\n'
+ERASE = '\x7f\b'
+EOF_KEY = '\x04'
+KEYS = list(hpdata.key_table) + hpdata.command_keys
+
+
+def is_number_prefix(text):
+    #
+    # Digits and points. A second point doesn't start a new number: the lot
+    # stays one token, and is turned down as a whole, so '3.1.4' can't
+    # quietly become 3.1 and .4
+    #
+    return all(char.isdigit() or char == '.' for char in text)
+
+
+class KeyParser:
+    #
+    # Turns a stream of characters into keys. feed() takes whatever has been
+    # typed so far; complete keys pile up in tokens, and what might still
+    # grow into a key is kept in partial.
+    #
+    def __init__(self):
+        self.partial = ''
+        self.tokens = collections.deque()
+        self.exponent = False
+
+    def grows(self, text):
+        #
+        # Could text be the start of a key or a number? Right after 'eex'
+        # a minus sign starts the exponent rather than being a key.
+        #
+        if self.exponent and text[0] == '-':
+            text = text[1:] or '0'
+        return is_number_prefix(text) or any(key.startswith(text) for key in KEYS)
+
+    def finished(self, text):
+        #
+        # A key that nothing longer starts with, such as '+' or 'sin'. Digits
+        # are keys too, but a number isn't over until something else comes.
+        #
+        return (text in KEYS and not is_number_prefix(text) and
+                not any(key != text and key.startswith(text) for key in KEYS))
+
+    def flush(self):
+        if self.partial:
+            self.tokens.append(self.partial)
+            self.exponent = self.partial == 'eex'
+            self.partial = ''
+
+    def feed(self, text):
+        for char in text:
+            if char in SEPARATORS:
+                self.flush()
+            elif char in ERASE:
+                self.partial = self.partial[:-1]
+            elif self.partial and self.grows(self.partial + char):
+                self.partial += char
+            else:
+                self.flush()
+                self.partial = char
+                if not self.grows(char):
+                    # Nothing starts with it: pass it on to be turned down
+                    self.flush()
+            if self.partial and not self.exponent and self.finished(self.partial):
+                self.flush()
+
+    def close(self):
+        self.flush()
+
+
+class KeyReader:
+    #
+    # Keys from stdin through a KeyParser, with the terminal in cbreak mode
+    # while it's in use. Use it as a context manager so the terminal is put
+    # back however the calculator stops.
+    #
+    def __init__(self, f=None):
+        self.f = f or sys.stdin
+        self.fd = self.f.fileno()
+        self.parser = KeyParser()
+        self.decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self.saved = None
+        self.eof = False
+        self.tty = self.f.isatty()
+
+    def __enter__(self):
+        if self.tty:
+            try:
+                import termios
+                import tty
+            except ImportError:
+                # No termios on Windows, so keys still need Enter there
+                self.tty = False
+            else:
+                self.saved = termios.tcgetattr(self.fd)
+                tty.setcbreak(self.fd)
+        return self
+
+    def __exit__(self, *exc):
+        if self.saved is not None:
+            import termios
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.saved)
+            self.saved = None
+        return False
+
+    def fill(self, timeout):
+        #
+        # Read whatever has arrived, waiting up to timeout seconds (None for
+        # as long as it takes) for something. Returns what was read.
+        #
+        if self.eof:
+            return ''
+        if timeout is not None and not select.select([self.fd], [], [], timeout)[0]:
+            return ''
+        data = os.read(self.fd, 4096)
+        if not data:
+            self.eof = True
+            self.parser.close()
+            return ''
+        text = self.decoder.decode(data)
+        if EOF_KEY in text:
+            text = text[:text.index(EOF_KEY)]
+            self.eof = True
+        self.parser.feed(text)
+        if self.eof:
+            self.parser.close()
+        return text
+
+    def pending(self):
+        # Are there keys waiting, or more typing to read?
+        self.fill(0)
+        return bool(self.parser.tokens)
+
+    def echo(self, text):
+        if not self.tty:
+            return
+        for char in text:
+            if char in ERASE:
+                sys.stdout.write('\b \b')
+            elif char in ' \t':
+                sys.stdout.write(' ')
+            elif char not in SEPARATORS:
+                sys.stdout.write(char)
+        sys.stdout.flush()
+
+    def token(self, prompt):
+        #
+        # The next key as typed. prompt() is called before waiting for the
+        # keyboard, so the display is only brought up to date when idle.
+        #
+        self.fill(0)
+        if not self.parser.tokens:
+            prompt()
+            if self.tty and not self.eof:
+                sys.stdout.write('> ' + self.parser.partial)
+                sys.stdout.flush()
+        while not self.parser.tokens:
+            if self.eof:
+                return 'off'
+            self.echo(self.fill(None))
+        return self.parser.tokens.popleft()
+
+    def read_key(self, prompt, message):
+        #
+        # Like hp35.get_cmd(): the next legal key and whether it's a number.
+        # Anything else gets 'Invalid entry' and is skipped.
+        #
+        while True:
+            choice = self.token(prompt)
+            if choice == 'pi':
+                return '3.141592654', True
+            if hp35.is_number(choice):
+                return choice, True
+            if choice in hpdata.key_table or choice in hpdata.command_keys:
+                return choice, False
+            message('Invalid entry ' + repr(choice))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --npy KEYS': run a keystroke program over arrays of starting values
+# too big to hold in memory. Each register given with --column REG=FILE is
+# read from a .npy file, or from a raw file of little-endian float64s, as
+# a memory map. The arrays are run through hp35vec a chunk at a time and the
+# chosen registers and the wink mask are written straight into memory-mapped
+# .npy files, PREFIX + 'X.npy' ... and PREFIX + 'wink.npy'.
+#
+# Only one chunk of each register is ever in memory, plus what the ops make
+# while working on it; the operating system pages the files in and out.
+#
+import sys
+import numpy as np
+import hp35
+import hp35vec
+
+REGISTERS = 'XYZTM'
+
+
+def open_column(path):
+    if path.endswith('.npy'):
+        column = np.load(path, mmap_mode='r')
+    else:
+        column = np.memmap(path, dtype='<f8', mode='r')
+    if column.ndim != 1:
+        raise ValueError(path + ' is not a one dimensional array')
+    return column
+
+
+def run_columns(tokens, columns, prefix, registers='X', chunk_size=1 << 20):
+    #
+    # columns maps registers to input file names. Returns the number of
+    # values and how many of them winked.
+    #
+    if chunk_size <= 0:
+        raise ValueError('the chunk size must be at least 1, not ' + str(chunk_size))
+    if isinstance(tokens, str):
+        tokens = hp35.parse_keys(tokens)
+    inputs = {reg: open_column(path) for reg, path in columns.items()}
+    lengths = set(len(column) for column in inputs.values())
+    if len(lengths) != 1:
+        raise ValueError('the input columns are not all the same length')
+    length = lengths.pop()
+    # Find any bad keys before making the output files
+    hp35vec.run_keys(tokens, np.zeros(0))
+    outputs = {reg: np.lib.format.open_memmap(prefix + reg + '.npy', mode='w+', dtype=np.float64, shape=(length,))
+               for reg in registers}
+    wink = np.lib.format.open_memmap(prefix + 'wink.npy', mode='w+', dtype=bool, shape=(length,))
+    winked = 0
+    for start in range(0, length, chunk_size):
+        end = min(start + chunk_size, length)
+        starting = {reg: inputs[reg][start:end] if reg in inputs else 0.0 for reg in REGISTERS}
+        stack, winks = hp35vec.run_keys(tokens, starting['X'], starting['Y'], starting['Z'], starting['T'],
+                                        starting['M'])
+        for reg, output in outputs.items():
+            output[start:end] = getattr(stack, reg)
+        wink[start:end] = winks
+        winked += int(np.count_nonzero(winks))
+    for output in outputs.values():
+        output.flush()
+    wink.flush()
+    return length, winked
+
+
+def npy(keys, columns, prefix, registers='X', chunk_size=None):
+    #
+    # columns is a list of 'REG=FILE' strings from the command line
+    #
+    chosen = {}
+    for column in columns:
+        reg, _, path = column.partition('=')
+        reg = reg.upper()
+        if reg not in REGISTERS or not path:
+            print("hp35: --column needs REG=FILE, with REG one of X, Y, Z, T and M, not '" + column + "'",
+                  file=sys.stderr)
+            return 2
+        chosen[reg] = path
+    if not chosen:
+        print('hp35: --npy needs at least one --column', file=sys.stderr)
+        return 2
+    try:
+        length, winked = run_columns(keys, chosen, prefix, registers, 1 << 20 if chunk_size is None else chunk_size)
+    except (OSError, ValueError) as err:
+        print('hp35:', err, file=sys.stderr)
+        return 2
+    print('hp35:', length, 'values,', winked, 'winked', file=sys.stderr)
+    return 0
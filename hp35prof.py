@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --profile': where the time goes in the interactive calculator. For
+# every key it records the time spent waiting for input, computing and
+# rendering (all the drawing that key led to, however many calls it took),
+# in log2 histograms, along with per-key counts and wink rates.
+# The summary goes to stderr on exit, or to a JSON file with --profile-json.
+#
+# When profiling is off none of this is loaded and main() only pays for an
+# 'is not None' test or two per key.
+#
+import json
+import sys
+import time
+
+PHASES = ('input', 'compute', 'render')
+BUCKETS = 32
+
+
+def bucket(seconds):
+    # Bucket i holds times from 2**(i-1) up to 2**i microseconds
+    return min(BUCKETS - 1, int(seconds * 1e6).bit_length())
+
+
+class Profiler:
+    def __init__(self):
+        self.histograms = {phase: [0] * BUCKETS for phase in PHASES}
+        self.totals = {phase: 0.0 for phase in PHASES}
+        self.maxima = {phase: 0.0 for phase in PHASES}
+        self.keys = {}
+        # Render time since the last key was computed, and what it was at begin()
+        self.render_time = 0.0
+        self.render_start = 0.0
+        self.computed = False
+        self.start = None
+
+    def add(self, phase, seconds):
+        self.histograms[phase][bucket(seconds)] += 1
+        self.totals[phase] += seconds
+        if seconds > self.maxima[phase]:
+            self.maxima[phase] = seconds
+
+    def begin(self):
+        self.start = time.perf_counter()
+        self.render_start = self.render_time
+
+    def render_done(self):
+        #
+        # Everything drawn since the last key was computed, as one sample:
+        # its frame, the prompt, and any redraws while waiting for the next
+        # key. What's drawn before the first key isn't counted.
+        #
+        if self.computed:
+            self.add('render', self.render_time)
+            self.computed = False
+        self.render_time = 0.0
+
+    def input_done(self):
+        #
+        # Input time is the time since begin() less any rendering done while
+        # waiting, e.g. the prompt redrawn by --raw
+        #
+        now = time.perf_counter()
+        self.add('input', now - self.start - (self.render_time - self.render_start))
+        self.start = now
+        self.render_done()
+
+    def compute_done(self, key, wink):
+        #
+        # Compute time is the time since input_done() less any rendering
+        # done on the way, e.g. by 'eex' or 'off'
+        #
+        now = time.perf_counter()
+        seconds = now - self.start - self.render_time
+        self.add('compute', seconds)
+        count, winks, total = self.keys.get(key, (0, 0, 0.0))
+        self.keys[key] = (count + 1, winks + bool(wink), total + seconds)
+        self.start = now
+        self.computed = True
+
+    def percentile(self, phase, fraction):
+        #
+        # Upper edge of the bucket the given fraction of the samples fall in
+        #
+        counts = self.histograms[phase]
+        target = fraction * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if count and seen >= target:
+                return float(2 ** i)
+        return 0.0
+
+    def summary(self):
+        self.render_done()
+        phases = {}
+        for phase in PHASES:
+            count = sum(self.histograms[phase])
+            phases[phase] = {'count': count,
+                             'mean_us': self.totals[phase] / count * 1e6 if count else 0.0,
+                             'p50_us': self.percentile(phase, 0.5),
+                             'p90_us': self.percentile(phase, 0.9),
+                             'p99_us': self.percentile(phase, 0.99),
+                             'max_us': self.maxima[phase] * 1e6,
+                             'histogram_log2_us': self.histograms[phase]}
+        keys = {key: {'count': count, 'winks': winks, 'wink_rate': winks / count,
+                      'mean_compute_us': total / count * 1e6}
+                for key, (count, winks, total) in sorted(self.keys.items())}
+        return {'phases': phases, 'keys': keys}
+
+    def report(self, f=sys.stderr):
+        summary = self.summary()
+        print(file=f)
+        print('{:<10}{:>8}{:>12}{:>12}{:>12}{:>12}{:>12}'.format(
+            'phase', 'count', 'mean µs', 'p50 µs', 'p90 µs', 'p99 µs', 'max µs'), file=f)
+        for phase, stats in summary['phases'].items():
+            print('{:<10}{:>8}{:>12.1f}{:>12.0f}{:>12.0f}{:>12.0f}{:>12.1f}'.format(
+                phase, stats['count'], stats['mean_us'], stats['p50_us'], stats['p90_us'], stats['p99_us'],
+                stats['max_us']), file=f)
+        print(file=f)
+        print('{:<10}{:>8}{:>8}{:>12}{:>12}'.format('key', 'count', 'winks', 'wink rate', 'mean µs'), file=f)
+        for key, stats in summary['keys'].items():
+            print('{:<10}{:>8}{:>8}{:>12.1%}{:>12.1f}'.format(
+                key, stats['count'], stats['winks'], stats['wink_rate'], stats['mean_compute_us']), file=f)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+            f.write('\n')
+
+
+class ProfiledRenderer:
+    #
+    # Wraps a renderer so that every call to it counts as render time, which
+    # the Profiler adds up and records once per key
+    #
+    def __init__(self, renderer, profiler):
+        self.renderer = renderer
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        method = getattr(self.renderer, name)
+        profiler = self.profiler
+
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                profiler.render_time += time.perf_counter() - start
+        return timed
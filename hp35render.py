@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --refresh RATE': draw the calculator from a thread of its own, so
+# working out a key never waits on the terminal.
+#
+# calc() and registers() only record what's to be shown and return. The
+# render thread draws the latest of it at most RATE times a second; frames
+# that are overtaken before they're drawn are dropped. Anything to do with
+# the prompt (menu, messages, exponent entry) first brings the display up to
+# date and then goes straight to the terminal, so what's on the screen when
+# the calculator waits for a key is always current.
+#
+import threading
+import time
+import hp35
+
+
+class ThreadedRenderer:
+    def __init__(self, renderer, rate=60.0):
+        self.renderer = renderer
+        self.interval = 1.0 / rate
+        self.condition = threading.Condition()
+        # Held while anything is being written to the terminal
+        self.lock = threading.Lock()
+        self.calc_args = None
+        self.stack = None
+        self.closed = False
+        self.drawn = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name='hp35 render', daemon=True)
+        self.thread.start()
+
+    def calc(self, display, valid_number, off):
+        with self.condition:
+            if self.calc_args is not None:
+                self.dropped += 1
+            self.calc_args = (display, valid_number, off)
+            self.condition.notify()
+
+    def registers(self, stack):
+        # A copy, since the registers change in place as keys are worked on
+        with self.condition:
+            self.stack = hp35.Registers(*stack.values())
+            self.condition.notify()
+
+    def run(self):
+        due = 0.0
+        while True:
+            with self.condition:
+                while self.calc_args is None and self.stack is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+            # Anything that comes in while waiting for the next slot replaces this frame
+            delay = due - time.monotonic()
+            if delay > 0.0:
+                time.sleep(delay)
+            self.draw()
+            due = time.monotonic() + self.interval
+
+    def draw(self):
+        with self.lock:
+            with self.condition:
+                calc_args, stack = self.calc_args, self.stack
+                self.calc_args = self.stack = None
+            if calc_args is not None:
+                self.renderer.calc(*calc_args)
+                self.drawn += 1
+            if stack is not None:
+                self.renderer.registers(stack)
+
+    def direct(self, name, *args):
+        # Bring the display up to date, then write straight to the terminal
+        self.draw()
+        with self.lock:
+            getattr(self.renderer, name)(*args)
+
+    def menu(self):
+        self.direct('menu')
+
+    def message(self, text):
+        self.direct('message', text)
+
+    def exponent(self, led_display):
+        self.direct('exponent', led_display)
+
+    def exponent_prompt(self):
+        self.direct('exponent_prompt')
+
+    def close(self):
+        self.draw()
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --serve': one process serving any number of calculator sessions over
+# TCP or a Unix socket. Each connection gets its own registers. A client
+# sends keys a line at a time ('3 e 4 +', 'sin', ...) and gets a line back
+# for each: the LED display, or X itself with --reply x. A line that winked
+# starts with 'wink ', one with a bad key gets 'error ...' and leaves the
+# registers as they were before the bad key. 'off' ends the session.
+#
+# An idle session is a coroutine waiting on a read plus a Registers object,
+# so thousands of them cost very little. Lines are limited in length, only
+# one line per session is worked on at a time and nothing more is read until
+# the reply has been taken up by the client, so a client can't make the
+# server buffer without limit.
+#
+import asyncio
+import sys
+import hp35
+
+MAX_LINE = 1024
+
+
+class Server:
+    def __init__(self, reply='led', max_sessions=10000, idle_timeout=3600.0):
+        self.reply = reply
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = 0
+
+    def respond(self, line, stack):
+        #
+        # Run one line of keys and return the reply and whether to hang up
+        #
+        tokens = hp35.parse_keys(line)
+        off = 'off' in tokens
+        try:
+            winks = hp35.replay_keys(tokens, stack)
+        except ValueError as err:
+            return 'error ' + str(err), off
+        if self.reply == 'x':
+            text = repr(stack.X)
+        else:
+            text = hp35.led_string(stack.X).rstrip()
+        if winks:
+            text = 'wink ' + text
+        return text, off
+
+    async def session(self, reader, writer):
+        if self.sessions >= self.max_sessions:
+            writer.write(b'error too many sessions\n')
+            await writer.drain()
+            writer.close()
+            return
+        self.sessions += 1
+        stack = hp35.Registers()
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except ValueError:
+                    # The line was longer than MAX_LINE
+                    writer.write(b'error line too long\n')
+                    break
+                if not line:
+                    break
+                text, off = self.respond(line.decode('utf-8', 'replace'), stack)
+                writer.write(text.encode() + b'\n')
+                await writer.drain()
+                if off:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    def start(self, address):
+        #
+        # A Unix socket if the address has a '/' in it, otherwise host:port
+        #
+        if '/' in address:
+            return asyncio.start_unix_server(self.session, path=address, limit=MAX_LINE)
+        host, _, port = address.rpartition(':')
+        return asyncio.start_server(self.session, host or '127.0.0.1', int(port), limit=MAX_LINE)
+
+
+def serve(address, reply='led', max_sessions=10000, idle_timeout=3600.0):
+    server = Server(reply, max_sessions, idle_timeout)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        listener = loop.run_until_complete(server.start(address))
+    except (OSError, ValueError) as err:
+        print('hp35: cannot serve on', address + ':', err, file=sys.stderr)
+        return 1
+    print('hp35 serving on', address, file=sys.stderr)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        loop.run_until_complete(listener.wait_closed())
+        loop.close()
+    return 0
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --solve KEYS --bracket A B': find an X between A and B for which the
+# keystroke program leaves 0 in X. The program is f(X), run from X with the
+# rest of the registers clear, e.g. "e x e 2 -" is x² - 2.
+#
+# Bisection, the secant method and Brent's method are all here; Brent's is
+# the default. Each stops once the root is pinned down to the 10 digits the
+# HP-35 shows, or f(X) comes out as exactly 0, which with the 9 decimal
+# places the engine keeps is as close as it can tell. The program is
+# compiled once (hp35compile) and then run straight on a Registers for each
+# evaluation, the same fast path as --program.
+#
+import collections
+import math
+import sys
+import time
+import hp35
+import hp35compile
+
+METHODS = ['brent', 'bisect', 'secant']
+MAX_ITERATIONS = 200
+
+Solution = collections.namedtuple('Solution', ['method', 'root', 'value', 'iterations', 'evaluations',
+                                               'seconds', 'converged'])
+
+
+def tolerance(x):
+    # Half a unit in the 10th digit, and no finer than the display can show
+    return 5e-11 * abs(x) + 1e-99
+
+
+def unit(x):
+    # A unit in the 10th digit of x rounded to 10 digits
+    return 10.0 ** (int(hp35.format_scientific(x).split('e')[1]) - 9)
+
+
+class Function:
+    #
+    # The program as a function of X, counting how often it's run. A key
+    # that winks means there's no f(X) there, which is an error.
+    #
+    def __init__(self, keys, engine=None):
+        self.engine = engine or hp35.float_engine
+        tokens = hp35.parse_keys(keys) if isinstance(keys, str) else list(keys)
+        self.run = hp35compile.make_runner(tokens, self.engine)
+        self.evaluations = 0
+
+    def __call__(self, x):
+        self.evaluations += 1
+        stack, wink = self.run([x])
+        if wink:
+            raise ValueError('the keys wink at X = ' + self.engine.led_string(self.engine.from_float(x)).strip())
+        return float(stack.X)
+
+
+def bracketed(f, a, b):
+    fa, fb = f(a), f(b)
+    if fa != 0.0 and fb != 0.0 and math.copysign(1.0, fa) == math.copysign(1.0, fb):
+        raise ValueError('f(X) has the same sign at both ends of the bracket')
+    return fa, fb
+
+
+def bisect(f, a, b):
+    # (root, f(root), iterations, converged)
+    fa, fb = bracketed(f, a, b)
+    if fa == 0.0:
+        return a, fa, 0, True
+    if fb == 0.0:
+        return b, fb, 0, True
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        middle = a + (b - a) / 2.0
+        fm = f(middle)
+        if fm == 0.0 or abs(b - a) / 2.0 < tolerance(middle):
+            return middle, fm, iteration, True
+        if math.copysign(1.0, fm) == math.copysign(1.0, fa):
+            a, fa = middle, fm
+        else:
+            b = middle
+    return middle, fm, MAX_ITERATIONS, False
+
+
+def settled(f, x, fx):
+    #
+    # Is x a root as far as 10 digits go? Either f changes sign between x
+    # and the 10 digit number either side of it, or f(x) is no further from
+    # 0 than that step moves it, which is as near as the rounding in the
+    # program lets f get. A side where the program winks doesn't count.
+    #
+    if fx == 0.0:
+        return True
+    for neighbour in (x - unit(x), x + unit(x)):
+        try:
+            value = f(neighbour)
+        except ValueError:
+            continue
+        if value == 0.0 or math.copysign(1.0, value) != math.copysign(1.0, fx) or abs(fx) <= abs(value - fx):
+            return True
+    return False
+
+
+def secant(f, a, b):
+    #
+    # Needs no bracket, but isn't sure to converge: it can run off to where
+    # the program winks, or stall where f is flat. So when the steps stop,
+    # settled() decides whether that's at a root or just somewhere flat.
+    #
+    x0, x1 = a, b
+    f0, f1 = f(x0), f(x1)
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        if f1 == 0.0:
+            return x1, f1, iteration - 1, True
+        if f1 == f0:
+            return x1, f1, iteration - 1, settled(f, x1, f1)
+        x2 = x1 - f1 * (x1 - x0) / (f1 - f0)
+        x0, f0 = x1, f1
+        x1, f1 = x2, f(x2)
+        if abs(x1 - x0) < tolerance(x1):
+            return x1, f1, iteration, settled(f, x1, f1)
+    return x1, f1, MAX_ITERATIONS, False
+
+
+def brent(f, a, b):
+    #
+    # Brent's method, as in scipy's brentq: inverse quadratic interpolation
+    # or a secant step where they make good progress, bisection where not,
+    # always keeping the root bracketed between current and block.
+    #
+    previous, current = a, b
+    f_previous, f_current = bracketed(f, a, b)
+    if f_previous == 0.0:
+        return previous, f_previous, 0, True
+    if f_current == 0.0:
+        return current, f_current, 0, True
+    block = f_block = 0.0
+    step_previous = step_current = 0.0
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        if math.copysign(1.0, f_previous) != math.copysign(1.0, f_current):
+            block, f_block = previous, f_previous
+            step_previous = step_current = current - previous
+        if abs(f_block) < abs(f_current):
+            previous, current, block = current, block, current
+            f_previous, f_current, f_block = f_current, f_block, f_current
+        delta = tolerance(current)
+        bisection = (block - current) / 2.0
+        if f_current == 0.0 or abs(bisection) < delta:
+            return current, f_current, iteration - 1, True
+        if abs(step_previous) > delta and abs(f_current) < abs(f_previous):
+            if previous == block:
+                interpolated = -f_current * (current - previous) / (f_current - f_previous)
+            else:
+                d_previous = (f_previous - f_current) / (previous - current)
+                d_block = (f_block - f_current) / (block - current)
+                interpolated = (-f_current * (f_block * d_block - f_previous * d_previous) /
+                                (d_block * d_previous * (f_block - f_previous)))
+            if 2.0 * abs(interpolated) < min(abs(step_previous), 3.0 * abs(bisection) - delta):
+                step_previous, step_current = step_current, interpolated
+            else:
+                step_previous = step_current = bisection
+        else:
+            step_previous = step_current = bisection
+        previous, f_previous = current, f_current
+        if abs(step_current) > delta:
+            current += step_current
+        else:
+            current += math.copysign(delta, bisection)
+        f_current = f(current)
+    return current, f_current, MAX_ITERATIONS, False
+
+
+def best_digits(f, root, value):
+    #
+    # The 10 digit number at or either side of the root that f is smallest
+    # at, and f there. With 9 decimal places, f can be the same size over a
+    # few of them, so the methods would otherwise stop on different ones; a
+    # tie goes to the one nearest the root. The neighbours are a step in the
+    # 10th digit away, or a tenth of that across a power of ten.
+    #
+    rounded = float(hp35.format_scientific(root))
+    step = unit(rounded)
+    candidates = {float(hp35.format_scientific(rounded + offset))
+                  for offset in (0.0, -step, step, -step / 10.0, step / 10.0)}
+    best = (abs(value), 0.0, root, value) if root == rounded else None
+    for candidate in sorted(candidates):
+        try:
+            result = value if candidate == root else f(candidate)
+        except ValueError:
+            continue
+        score = (abs(result), abs(candidate - root), candidate, result)
+        if best is None or score < best:
+            best = score
+    if best is None:
+        return rounded, f(rounded)
+    return best[2], best[3]
+
+
+def solve(keys, a, b, method='brent', engine=None):
+    #
+    # A Solution with the root, f(root), how many iterations and runs of
+    # the program it took, how long, and whether it converged. Raises
+    # ValueError for bad keys, a bracket that doesn't straddle a root, or an
+    # X where the program winks.
+    #
+    if method not in METHODS:
+        raise ValueError("no such method '" + method + "', use one of " + ', '.join(METHODS))
+    f = Function(keys, engine)
+    start = time.perf_counter()
+    root, value, iterations, converged = globals()[method](f, float(a), float(b))
+    # To the 10 digits the HP-35 has, and f there
+    if converged:
+        root, value = best_digits(f, root, value)
+    else:
+        rounded = float(hp35.format_scientific(root))
+        if rounded != root:
+            root, value = rounded, f(rounded)
+    return Solution(method, root, value, iterations, f.evaluations, time.perf_counter() - start, converged)
+
+
+def report(keys, a, b, methods, engine=None):
+    engine = engine or hp35.float_engine
+    status = 0
+    for method in methods:
+        try:
+            solution = solve(keys, a, b, method, engine)
+        except ValueError as err:
+            print('hp35: ' + method + ':', err, file=sys.stderr)
+            status = 1
+            continue
+        print('{:<8}{}  f(x) {}{:>5} iterations{:>5} evaluations{:>10.3f} ms{}'.format(
+            method, engine.led_string(engine.from_float(solution.root)),
+            engine.led_string(engine.from_float(solution.value)), solution.iterations, solution.evaluations,
+            solution.seconds * 1000.0, '' if solution.converged else '  did not converge'))
+        if not solution.converged:
+            status = 1
+    return status
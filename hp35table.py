@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --tabulate KEYS --x START:STOP:STEP [--y START:STOP:STEP]': a table
+# of what a keystroke program leaves in X, run from every X in a range, or
+# from every (X, Y) pair of a grid, x changing slowest. STOP is included
+# when the steps land on it, and values are worked out from the decimal
+# digits given, so 0:1:0.1 has 0.3 in it rather than 0.30000000000000004.
+#
+# Rows go out as CSV (x, y, X and 'wink' where a key winked, or 'error'
+# and the reason where the program couldn't be run), or with --format led
+# as text with X as the LED display shows it. They're made a chunk at a
+# time and written as they're done, so memory use doesn't depend on the
+# size of the table. With --jobs the chunks are shared out over that many
+# processes, and still written in order.
+#
+import collections
+import concurrent.futures
+import decimal
+import os
+import sys
+import hp35
+import hp35compile
+
+CHUNK_SIZE = 4096
+
+#
+# A range of values, START + i * STEP for i from 0 to count - 1, kept as
+# whole numbers of 10**-places so each value is one exact division
+#
+Range = collections.namedtuple('Range', ['start', 'step', 'count', 'places'])
+
+#
+# Programs already compiled in this process, by keys and engine
+#
+runners = {}
+
+
+def parse_range(text):
+    fields = text.split(':')
+    if len(fields) != 3:
+        raise ValueError("a range is START:STOP:STEP, not '" + text + "'")
+    try:
+        start, stop, step = (decimal.Decimal(field) for field in fields)
+    except decimal.InvalidOperation:
+        raise ValueError("a range is START:STOP:STEP, not '" + text + "'")
+    if not all(value.is_finite() for value in (start, stop, step)) or step == 0:
+        raise ValueError("the range '" + text + "' needs a STEP other than 0")
+    places = max(0, -min(value.as_tuple().exponent for value in (start, stop, step)))
+    start, stop, step = (int(value.scaleb(places)) for value in (start, stop, step))
+    count = (stop - start) // step + 1
+    if count <= 0:
+        raise ValueError("the range '" + text + "' is empty")
+    return Range(start, step, count, places)
+
+
+def value(values, index):
+    return (values.start + index * values.step) / 10 ** values.places
+
+
+def runner(keys, engine_name):
+    key = (keys, engine_name)
+    if key not in runners:
+        runners[key] = hp35compile.make_runner(hp35.parse_keys(keys), hp35.get_engine(engine_name))
+    return runners[key]
+
+
+def led_strings(engine, results):
+    if engine is hp35.float_engine:
+        # All of the chunk at once
+        import hp35vec
+        return list(hp35vec.format_led([float(x) for x in results]))
+    return [engine.led_string(x) for x in results]
+
+
+def run_chunk(keys, engine_name, xs, ys, first, last, form):
+    #
+    # The text of rows first to last - 1. Row i is x number i // ys.count
+    # and y number i % ys.count; with no ys, just x number i.
+    #
+    engine = hp35.get_engine(engine_name)
+    run = runner(keys, engine_name)
+    across = ys.count if ys is not None else 1
+    if form == 'led':
+        def label(number):
+            return '{:<18}'.format(repr(number))
+    else:
+        def label(number):
+            return repr(number) + ','
+    # Each y comes round again for every x, so it's only worked out once
+    y_columns = {}
+    starts = []
+    labels = []
+    for row in range(first, last):
+        across_row = row % across
+        if across_row == 0 or row == first:
+            x = value(xs, row // across)
+            x_label = label(x)
+        if ys is None:
+            starts.append([x])
+            labels.append(x_label)
+            continue
+        if across_row not in y_columns:
+            y = value(ys, across_row)
+            y_columns[across_row] = y, label(y)
+        y, y_label = y_columns[across_row]
+        starts.append([x, y])
+        labels.append(x_label + y_label)
+    results = []
+    notes = []
+    for start in starts:
+        try:
+            stack, wink = run(start)
+        except (ArithmeticError, ValueError) as err:
+            results.append(engine.zero)
+            notes.append('error ' + str(err))
+            continue
+        results.append(stack.X)
+        notes.append('wink' if wink else '')
+    lines = []
+    if form == 'led':
+        for text, led, note in zip(labels, led_strings(engine, results), notes):
+            if note.startswith('error'):
+                led = note
+            elif note:
+                led += '  ' + note
+            lines.append((text + led).rstrip() + '\n')
+    else:
+        for text, x, note in zip(labels, results, notes):
+            if note.startswith('error'):
+                x = ''
+            lines.append(text + str(x) + ',' + note + '\n')
+    return ''.join(lines)
+
+
+def chunks(xs, ys, chunk_size):
+    rows = xs.count * (ys.count if ys is not None else 1)
+    for first in range(0, rows, chunk_size):
+        yield first, min(first + chunk_size, rows)
+
+
+def tabulate(keys, x_range, y_range=None, form='csv', out=None, engine=None, jobs=None, chunk_size=None):
+    engine = engine or hp35.float_engine
+    out = out or sys.stdout
+    chunk_size = CHUNK_SIZE if chunk_size is None else chunk_size
+    try:
+        if chunk_size < 1:
+            raise ValueError('the chunk size must be at least 1, not ' + str(chunk_size))
+        xs = parse_range(x_range)
+        ys = parse_range(y_range) if y_range is not None else None
+        # Compile here first, so bad keys are reported before anything is written
+        runner(keys, engine.name)
+    except ValueError as err:
+        print('hp35:', err, file=sys.stderr)
+        return 2
+    try:
+        names = ['x', 'y'] if ys is not None else ['x']
+        if form == 'led':
+            out.write(''.join('{:<18}'.format(name) for name in names) + 'X\n')
+        else:
+            out.write(','.join(names) + ',X,wink\n')
+        if not jobs or jobs == 1:
+            for first, last in chunks(xs, ys, chunk_size):
+                out.write(run_chunk(keys, engine.name, xs, ys, first, last, form))
+        else:
+            # A few chunks per process in flight at a time, written in order
+            with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+                pending = collections.deque()
+                for first, last in chunks(xs, ys, chunk_size):
+                    pending.append(executor.submit(run_chunk, keys, engine.name, xs, ys, first, last, form))
+                    if len(pending) >= 2 * jobs:
+                        out.write(pending.popleft().result())
+                while pending:
+                    out.write(pending.popleft().result())
+        out.flush()
+    except BrokenPipeError:
+        # As in hp35filter: the reader went away, e.g. '... | head'
+        os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+    return 0
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# 'hp35 --trace FILE': keep the last N keys the engine worked on, and the
+# registers each left behind, in a ring buffer in memory, and write it to
+# FILE when a key winks, when hp35 dies of an uncaught exception, on demand
+# with SIGUSR1 and on the way out.
+#
+# The buffer is one bytearray made up front, and each key is packed into
+# the next slot of it in place: a sequence number, the key's id, whether it
+# winked and X, Y, Z, T and M after it, 51 bytes with nothing allocated.
+# FILE has the same slots, after a header giving the record size, the
+# number of slots, how many records have been written and the key names
+# the ids stand for, so it can be read back without this version of hp35.
+# A dump writes only the records added since the last one, into their
+# slots, and then the header, so winking often costs little. To read one:
+#
+#   python3 hp35trace.py FILE [-n LAST]
+#
+import argparse
+import atexit
+import signal
+import struct
+import sys
+import hp35data as hpdata
+
+MAGIC = b'HP35TRACE2'
+HEADER = struct.Struct('<IIQI')
+RECORD = struct.Struct('<QH?5d')
+#
+# Ids for everything that changes the registers: the keys, 'undo' and
+# 'redo', and 'number' for a number keyed in
+#
+KEY_NAMES = list(hpdata.key_table) + hpdata.command_keys + ['number']
+KEY_IDS = {name: number for number, name in enumerate(KEY_NAMES)}
+DEFAULT_SIZE = 65536
+
+
+class Tracer:
+    def __init__(self, path, size=DEFAULT_SIZE):
+        self.path = path
+        self.size = size
+        self.buffer = bytearray(size * RECORD.size)
+        self.sequence = 0
+        self.pack_into = RECORD.pack_into
+        # How many records are in the file, and the file once there is one
+        self.dumped = 0
+        self.file = None
+        self.names = '\n'.join(KEY_NAMES).encode()
+        self.start = len(MAGIC) + HEADER.size + len(self.names)
+        self.dumping = False
+        self.dumps = 0
+
+    def record(self, key, stack, wink):
+        self.pack_into(self.buffer, self.sequence % self.size * RECORD.size, self.sequence, KEY_IDS[key], wink,
+                       stack.X, stack.Y, stack.Z, stack.T, stack.M)
+        self.sequence += 1
+        if wink:
+            self.dump()
+
+    def dump(self):
+        #
+        # The records since the last dump go into their slots in the file,
+        # in at most two runs where they wrap round, and then the header with
+        # the new count. A dump asked for in the middle of another (SIGUSR1)
+        # is left to the next one.
+        #
+        if self.dumping:
+            return
+        self.dumping = True
+        try:
+            if self.file is None:
+                self.file = open(self.path, 'w+b')
+                self.file.write(MAGIC + HEADER.pack(RECORD.size, self.size, 0, len(self.names)) + self.names)
+            view = memoryview(self.buffer)
+            sequence = max(self.dumped, self.sequence - self.size)
+            while sequence < self.sequence:
+                slot = sequence % self.size
+                count = min(self.sequence - sequence, self.size - slot)
+                self.file.seek(self.start + slot * RECORD.size)
+                self.file.write(view[slot * RECORD.size:(slot + count) * RECORD.size])
+                sequence += count
+            self.file.seek(len(MAGIC))
+            self.file.write(HEADER.pack(RECORD.size, self.size, self.sequence, len(self.names)))
+            self.file.flush()
+            self.dumped = self.sequence
+            self.dumps += 1
+        finally:
+            self.dumping = False
+
+
+def install(tracer):
+    #
+    # Trace every key hp35 works on from now on, and dump on an uncaught
+    # exception, on SIGUSR1 (where there is one) and at exit
+    #
+    import hp35
+    hp35.tracer = tracer
+    previous_hook = sys.excepthook
+
+    def dump():
+        try:
+            tracer.dump()
+        except OSError:
+            pass
+
+    def excepthook(kind, value, traceback):
+        dump()
+        previous_hook(kind, value, traceback)
+    sys.excepthook = excepthook
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
+    atexit.register(dump)
+
+
+def read(path):
+    #
+    # (sequence, key, wink, X, Y, Z, T, M) for each record in a dump
+    #
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(path + ' is not an hp35 trace')
+    start = len(MAGIC) + HEADER.size
+    size, slots, written, names_length = HEADER.unpack_from(data, len(MAGIC))
+    if size != RECORD.size:
+        raise ValueError(path + ' has ' + str(size) + ' byte records, not ' + str(RECORD.size))
+    names = data[start:start + names_length].decode().split('\n')
+    start += names_length
+    # Slot order is only oldest first until the ring wraps round
+    records = sorted(RECORD.iter_unpack(data[start:start + min(written, slots) * size]))
+    for record in records:
+        sequence, key = record[:2]
+        yield (sequence, names[key] if key < len(names) else '#' + str(key)) + record[2:]
+
+
+def main():
+    my_parser = argparse.ArgumentParser(prog="hp35trace", description='Print an hp35 --trace dump.')
+    my_parser.add_argument('file', help='the trace file')
+    my_parser.add_argument('-n', '--last', type=int, help='only the last LAST records')
+    args = my_parser.parse_args()
+    try:
+        records = list(read(args.file))
+    except (OSError, ValueError, struct.error) as err:
+        print('hp35trace:', err, file=sys.stderr)
+        sys.exit(1)
+    if args.last is not None:
+        records = records[-args.last:] if args.last > 0 else []
+    print('{:>10}  {:<7}{:<6}{:>18}{:>18}{:>18}{:>18}{:>18}'.format('sequence', 'key', 'wink', 'X', 'Y', 'Z', 'T', 'M'))
+    for sequence, key, wink, *registers in records:
+        print('{:>10}  {:<7}{:<6}'.format(sequence, key, 'wink' if wink else '') +
+              ''.join('{:>18}'.format(repr(value)) for value in registers))
+
+
+if __name__ == "__main__":
+    main()
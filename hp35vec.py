@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# A NumPy version of the HP-35 engine. The X, Y, Z, T and memory registers
+# are arrays, so one keystroke sequence is evaluated over any number of
+# starting values in a single pass. Each function mirrors the scalar one of
+# the same name in hp35.py: results are rounded to 9 decimal places (with
+# np.round for ln and the inverse trig functions, which is what
+# hp35.scaled_round() does), the 'edge' numbers are clamped the same way,
+# and where the scalar function would wink the element is set to 0.0 and
+# flagged in a wink mask instead.
+# NumPy's exp, log and power can differ from the math module's in the last
+# bit, so a long chain of keys can occasionally drift from the scalar engine
+# beyond the 10 digits the HP-35 shows.
+#
+import numpy as np
+import hp35
+import hp35data as hpdata
+
+HP35_MAX = 9.99999999e+99
+
+
+def round9(values):
+    #
+    # Python's round(x, 9) works on the exact decimal value of the float,
+    # np.round(x, 9) doesn't, so do it in two exact pieces: the integer part,
+    # and the fraction scaled up to whole billionths. Anything at or above
+    # 2**23 can't hold a 9th decimal place, so round() leaves it alone.
+    # Fractions that land within a hair of half a billionth are passed to
+    # round() itself so ties go exactly the same way.
+    #
+    values = np.asarray(values, dtype=np.float64)
+    number = np.abs(values)
+    small = ~(number >= 2.0 ** 23)
+    whole = np.floor(np.where(small, number, 0.0))
+    scaled = (np.where(small, number, 0.0) - whole) * 1e9
+    billionths = np.rint(scaled)
+    result = np.copysign((whole * 1e9 + billionths) / 1e9, values)
+    result = np.where(small, result, values)
+    near_tie = small & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if near_tie.any():
+        result[near_tie] = [round(float(v), 9) for v in values[near_tie]]
+    return result
+
+
+def add(stack):
+    stack.X = round9(stack.X + stack.Y)
+
+
+def subtract(stack):
+    stack.X = round9(stack.Y - stack.X)
+
+
+def multiply(stack):
+    #
+    # A float product overflows to inf rather than raising, so this can't wink
+    #
+    stack.X = round9(stack.Y * stack.X)
+
+
+def divide(stack):
+    wink = stack.X == 0.0
+    quotient = stack.Y / np.where(wink, 1.0, stack.X)
+    stack.X = np.where(wink, 0.0, round9(quotient))
+    return wink
+
+
+def reciprocal(stack):
+    wink = stack.X == 0.0
+    quotient = 1.0 / np.where(wink, 1.0, stack.X)
+    stack.X = np.where(wink, 0.0, round9(quotient))
+    return wink
+
+
+def square_root(stack):
+    wink = stack.X < 0.0
+    root = np.sqrt(np.where(wink, 0.0, stack.X))
+    stack.X = np.where(wink, 0.0, round9(root))
+    return wink
+
+
+def log(stack):
+    wink = ~(stack.X > 0.0)
+    the_log = np.log10(np.where(wink, 1.0, stack.X))
+    stack.X = np.where(wink, 0.0, round9(the_log))
+    return wink
+
+
+def ln(stack):
+    wink = ~(stack.X > 0.0)
+    the_log = np.log(np.where(wink, 1.0, stack.X))
+    stack.X = np.where(wink, 0.0, np.round(the_log, 9))
+    return wink
+
+
+def sin(stack):
+    #
+    # math.sin() raises on inf, so an infinite X winks here
+    #
+    wink = np.isinf(stack.X)
+    sine = np.sin(np.deg2rad(np.where(wink, 0.0, stack.X)))
+    stack.X = np.where(wink, 0.0, round9(sine))
+    return wink
+
+
+def arcsin(stack):
+    number = stack.X
+    wink = ~((-1 <= number) & (number <= 1))
+    asin = np.rad2deg(np.arcsin(np.where(wink, 0.0, number)))
+    stack.X = np.where(wink, 0.0, np.round(asin, 9))
+    return wink
+
+
+def cos(stack):
+    wink = np.isinf(stack.X)
+    cosine = np.cos(np.deg2rad(np.where(wink, 0.0, stack.X)))
+    stack.X = np.where(wink, 0.0, round9(cosine))
+    return wink
+
+
+def arccos(stack):
+    number = stack.X
+    wink = ~((-1 <= number) & (number <= 1))
+    acos = np.rad2deg(np.arccos(np.where(wink, 0.0, number)))
+    stack.X = np.where(wink, 0.0, np.round(acos, 9))
+    return wink
+
+
+def tan(stack):
+    number = stack.X
+    wink = np.isinf(number)
+    tangent = np.tan(np.deg2rad(np.where(wink, 0.0, number)))
+    tangent = np.where(number / 90.0 == 1.0, HP35_MAX, tangent)
+    tangent = np.where(number / 90.0 == 3.0, -HP35_MAX, tangent)
+    stack.X = np.where(wink, 0.0, round9(tangent))
+    return wink
+
+
+def arctan(stack):
+    stack.X = np.round(np.rad2deg(np.arctan(stack.X)), 9)
+
+
+def exp(stack):
+    #
+    # math.pow() raises OverflowError when finite arguments overflow, and
+    # ValueError for 0 to a negative power; both wink here.
+    #
+    x = stack.X
+    y = stack.Y
+    x_to_y = np.power(np.where(x >= 0.0, x, 1.0), y)
+    over_flow = np.isinf(x_to_y) & np.isfinite(x) & np.isfinite(y)
+    wink = ~(x >= 0.0) | over_flow | ((x == 0.0) & (y < 0.0))
+    x_to_y = np.where(x_to_y > HP35_MAX, HP35_MAX, round9(x_to_y))
+    stack.X = np.where(wink, 0.0, x_to_y)
+    return wink
+
+
+def ex(stack):
+    number = stack.X
+    e_to_x = np.exp(number)
+    wink = np.isinf(e_to_x) & np.isfinite(number)
+    e_to_x = np.where(e_to_x > HP35_MAX, HP35_MAX, round9(e_to_x))
+    stack.X = np.where(wink, 0.0, e_to_x)
+    return wink
+
+
+def clear_x(stack):
+    stack.X = np.zeros(stack.X.shape)
+
+
+def change_sign(stack):
+    stack.X = stack.X * -1.0
+
+
+def clear(stack):
+    for reg in stack.__slots__:
+        setattr(stack, reg, np.zeros(stack.X.shape))
+
+
+#
+# Key -> handler from the table in hp35data, using the array version of an op
+# where there is one and the Registers stack moves otherwise, since they
+# work on arrays as they are.
+#
+operations = {key: globals().get(spec.handler) or hp35.key_handler(spec.handler)
+              for key, spec in hpdata.key_table.items() if spec.handler}
+
+
+def run_keys(tokens, x, y=0.0, z=0.0, t=0.0, mem=0.0):
+    #
+    # Evaluate a keystroke sequence (a string or a list of tokens) over arrays
+    # of starting register values, which are broadcast against each other.
+    # Returns the final registers, as an hp35.Registers holding arrays, and a
+    # mask of the elements where any key winked.
+    #
+    if isinstance(tokens, str):
+        tokens = hp35.parse_keys(tokens)
+    x, y, z, t, mem = np.broadcast_arrays(*[np.asarray(r, dtype=np.float64) for r in (x, y, z, t, mem)])
+    stack = hp35.Registers(x, y, z, t, mem)
+    winks = np.zeros(x.shape, dtype=bool)
+    with np.errstate(all='ignore'):
+        for cmd in tokens:
+            if cmd == 'pi':
+                cmd = '3.141592654'
+            if hp35.is_number(cmd):
+                stack.X = np.full(x.shape, hp35.entry_value(cmd))
+            elif cmd in operations:
+                wink = operations[cmd](stack)
+                if wink is not None:
+                    winks = winks | wink
+            elif cmd == 'off':
+                break
+            elif cmd == 'on':
+                pass
+            elif cmd == 'eex':
+                raise ValueError("'eex' isn't supported on arrays, enter the number as e.g. 1.5e-12")
+            elif cmd not in hpdata.key_table:
+                raise ValueError("Invalid entry '" + cmd + "'")
+    return stack, winks
+
+
+POWERS = 10 ** np.arange(18, dtype=np.int64)
+# Exact up to 10**22, and so then is the rounding of a product or quotient
+TENS = 10.0 ** np.arange(309)
+
+
+def scale(number, power):
+    # number * 10**power
+    return np.where(power >= 0, number * TENS[np.maximum(power, 0)], number / TENS[np.maximum(-power, 0)])
+
+
+def decade(number):
+    # The exponent of 10 in scientific notation; log10 can be out by one
+    # right next to a power of ten
+    exponent = np.floor(np.log10(number)).astype(np.int64)
+    exponent += number >= scale(10.0, exponent)
+    exponent -= number < scale(1.0, exponent)
+    return exponent
+
+
+def characters(text):
+    # Character codes as the LED strings hold them, 4 bytes to a character,
+    # as a column to go with the column of characters for each number
+    return np.array([ord(char) for char in text], dtype=np.uint32)[:, None]
+
+
+#
+# The characters are built up a position at a time, each position a row of
+# the characters there for every number, so each step works on a single
+# contiguous array. format_led() turns them round into strings at the end.
+#
+def led_fixed(number, negative):
+    #
+    # The LED characters for numbers from 0.01 to 10**9: repr() with its
+    # trailing zeros stripped, after the sign, cut or padded to 15. repr()
+    # is the fewest digits that read back as the same float, and there's
+    # only ever one 15 digit decimal that does, so if the number rounded to
+    # 15 digits reads back, that's it with the trailing zeros dropped.
+    #
+    # Otherwise repr() has 16 or 17 digits, the last of them not 0, and the
+    # display only has room for 14. Those are the number's own first 14
+    # digits, cut off rather than rounded, unless it's too close to where
+    # one of them changes to be sure; they're marked in the mask returned
+    # with the characters.
+    #
+    exponent = decade(number)
+    places = 14 - exponent
+    shown = np.rint(scale(number, places))
+    exact = scale(shown, -places) == number
+    cut = scale(number, places - 1)
+    missed = ~exact & (np.abs(cut - np.rint(cut)) < 0.02)
+    shown = np.where(exact, shown, np.floor(cut) * 10.0)
+    whole, fraction = np.divmod(shown.astype(np.int64), POWERS[places])
+    fraction *= POWERS[16 - places]
+    #
+    # Every number laid out the same way: a spare place for the sign, nine
+    # whole digits, '.' and 16 decimal places. Then each number is read
+    # from its first digit, or the sign just before it.
+    #
+    table = np.empty((27, len(number)), dtype=np.uint32)
+    table[0] = ord(' ')
+    for place in range(9, 0, -1):
+        table[place] = whole % 10 + ord('0')
+        whole //= 10
+    table[10] = ord('.')
+    trailing = exact
+    for place in range(26, 10, -1):
+        digit = fraction % 10
+        fraction //= 10
+        trailing &= digit == 0
+        table[place] = np.where(trailing, ord(' '), digit + ord('0'))
+    first = 9 - np.maximum(exponent, 0)
+    table[first[negative] - 1, np.flatnonzero(negative)] = ord('-')
+    start = first - negative
+    return np.take_along_axis(table, start + np.arange(15)[:, None], axis=0), missed
+
+
+def led_scientific(number, negative):
+    #
+    # The LED characters for numbers from 1e-99 up to the edge: the sign,
+    # the mantissa to ten digits with trailing zeros blanked, and a space or
+    # a minus sign and the exponent. The mantissa is worked out with float
+    # arithmetic, so where that lands within a hair of half a unit in the
+    # last digit the number is marked in the mask returned with the
+    # characters, to be done by hp35.format_led() itself.
+    #
+    exponent = decade(number)
+    scaled = scale(number, 9 - exponent)
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-4
+    mantissa = np.rint(scaled).astype(np.int64)
+    # 9.9999999995 and up round to 10.00000000
+    carry = mantissa == POWERS[10]
+    mantissa[carry] = POWERS[9]
+    exponent = np.abs(exponent + carry)
+    chars = np.empty((15, len(number)), dtype=np.uint32)
+    chars[0] = np.where(negative, ord('-'), ord(' '))
+    trailing = np.ones(len(number), dtype=bool)
+    for place in range(11, 2, -1):
+        digit = mantissa % 10
+        mantissa //= 10
+        trailing &= digit == 0
+        chars[place] = np.where(trailing, ord(' '), digit + ord('0'))
+    chars[1] = mantissa + ord('0')
+    chars[2] = ord('.')
+    chars[12] = np.where(number >= 1000000000.0, ord(' '), ord('-'))
+    chars[13] = exponent // 10 + ord('0')
+    chars[14] = exponent % 10 + ord('0')
+    return chars, near_tie
+
+
+def led_block(values):
+    # The LED strings for a flat array of values, and a mask of the ones
+    # that still need doing
+    number = np.abs(values)
+    negative = np.signbit(values)
+    chars = np.empty((15, len(values)), dtype=np.uint32)
+    zero = number == 0.0
+    high = values >= HP35_MAX
+    low = values < -HP35_MAX
+    for chosen, text in ((zero & negative, '-0.            '), (zero & ~negative, '0.             '),
+                         (high, ' 9.999999999 99'), (low, '-9.999999999 99')):
+        chars[:, chosen] = characters(text)
+    odd = np.isnan(values) | ~zero & (number < 1e-99)
+    fixed = (0.01 < number) & (number < 1000000000.0)
+    for chosen, led in ((fixed, led_fixed), (~(zero | high | low | odd | fixed), led_scientific)):
+        if chosen.any():
+            chars[:, chosen], missed = led(number[chosen], negative[chosen])
+            odd[np.flatnonzero(chosen)[missed]] = True
+    return np.ascontiguousarray(chars.T).view('U15').ravel(), odd
+
+
+def format_led(values, block_size=1 << 16):
+    #
+    # hp35.format_led() over an array: the 15 character LED string for each
+    # element, as an array of the same shape, worked out for all the
+    # elements together a block at a time, so the working arrays stay in
+    # the processor's cache. The few values the array arithmetic can't be
+    # sure of, and NaN and anything smaller than 1e-99 (whose exponent has
+    # three digits, making the string 16 long), go through hp35.format_led()
+    # one at a time.
+    #
+    values = np.asarray(values, dtype=np.float64)
+    shape = values.shape
+    values = values.ravel()
+    result = np.empty(len(values), dtype='U15')
+    odd = np.zeros(len(values), dtype=bool)
+    for start in range(0, len(values), block_size):
+        end = start + block_size
+        result[start:end], odd[start:end] = led_block(values[start:end])
+    if odd.any():
+        missed = [hp35.format_led(value) for value in values[odd]]
+        result = result.astype('U' + str(max(15, max(len(text) for text in missed))))
+        result[odd] = missed
+    return result.reshape(shape)
@@ -10,7 +10,7 @@ setup(
     long_description=readme,
     author='Paul Dunphy',
     include_package_data=True,
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     url='https://github.com/ve1dx/hp-35',
     entry_points={
         'console_scripts': ['hp35=hp35:main'],
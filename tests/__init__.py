@@ -0,0 +1,6 @@
+#
+# Tests for hp35, run from the top of the tree with either of
+#
+#   python -m unittest
+#   python -m pytest tests
+#
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35bcd's integer arithmetic against the decimal module rounding to 10
+# significant digits, half away from zero (ROUND_HALF_UP): +, -, x, ÷ and
+# √x on random Numbers, near each other in size and not, with results
+# past 9.999999999 x 10⁹⁹ sticking there and those below 10⁻⁹⁹ becoming 0.
+# Then led_string() at the edges of the fixed point range and past them.
+#
+import decimal
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+import hp35bcd  # noqa: E402
+
+PAIRS = 20000
+CONTEXT = decimal.Context(prec=hp35bcd.DIGITS, rounding=decimal.ROUND_HALF_UP, Emax=999, Emin=-999)
+OPS = {'add': CONTEXT.add, 'subtract': CONTEXT.subtract, 'multiply': CONTEXT.multiply, 'divide': CONTEXT.divide}
+
+
+def to_decimal(number):
+    return decimal.Decimal(number.mantissa).scaleb(number.exponent - hp35bcd.DIGITS + 1)
+
+
+def expected(value):
+    # What the HP-35 keeps of a correctly rounded result
+    if value.is_zero() or value.adjusted() < -99:
+        return decimal.Decimal(0)
+    if value.adjusted() > 99:
+        return to_decimal(hp35bcd.HP35_MAX).copy_sign(value)
+    return value
+
+
+def numbers(generator, count):
+    #
+    # Pairs with exponents close together, so digits overlap and carry, and
+    # far apart; mantissas of all nines, round ones, and random ones
+    #
+    mantissas = [hp35bcd.LOW, hp35bcd.HIGH - 1, 5 * 10 ** 9, 1999999999]
+    for n in range(count):
+        pair = []
+        exponent = generator.randint(-99, 99)
+        for which in range(2):
+            mantissa = generator.choice(mantissas) if generator.random() < 0.1 else \
+                generator.randrange(hp35bcd.LOW, hp35bcd.HIGH)
+            if generator.random() < 0.5:
+                mantissa = -mantissa
+            if generator.random() < 0.7:
+                exponent = max(-99, min(99, exponent + generator.randint(-12, 12)))
+            else:
+                exponent = generator.randint(-99, 99)
+            pair.append(hp35bcd.Number(mantissa, exponent))
+        yield pair
+
+
+def well_formed(number):
+    return number == hp35bcd.ZERO or (hp35bcd.LOW <= abs(number.mantissa) < hp35bcd.HIGH and
+                                      -99 <= number.exponent <= 99)
+
+
+class TestArithmetic(unittest.TestCase):
+    def test_binary(self):
+        generator = random.Random(35)
+        for y, x in numbers(generator, PAIRS):
+            for name, reference in OPS.items():
+                stack = hp35.Registers(x, y, hp35bcd.ZERO, hp35bcd.ZERO, hp35bcd.ZERO)
+                getattr(hp35bcd, name)(stack)
+                self.assertTrue(well_formed(stack.X), (name, y, x, stack.X))
+                self.assertEqual(to_decimal(stack.X), expected(reference(to_decimal(y), to_decimal(x))),
+                                 (name, y, x, stack.X))
+
+    def test_square_root(self):
+        generator = random.Random(36)
+        for y, x in numbers(generator, PAIRS):
+            x = abs(x)
+            stack = hp35.Registers(x, y, hp35bcd.ZERO, hp35bcd.ZERO, hp35bcd.ZERO)
+            self.assertFalse(hp35bcd.square_root(stack))
+            self.assertTrue(well_formed(stack.X), (x, stack.X))
+            self.assertEqual(to_decimal(stack.X), expected(CONTEXT.sqrt(to_decimal(x))), (x, stack.X))
+
+    def test_zero(self):
+        one = hp35bcd.ONE
+        stack = hp35.Registers(one, one, hp35bcd.ZERO, hp35bcd.ZERO, hp35bcd.ZERO)
+        hp35bcd.subtract(stack)
+        self.assertEqual(stack.X, hp35bcd.ZERO)
+        stack.Y = one
+        self.assertTrue(hp35bcd.divide(stack))
+        self.assertTrue(hp35bcd.reciprocal(stack))
+        self.assertFalse(hp35bcd.square_root(stack))
+        self.assertEqual(stack.X, hp35bcd.ZERO)
+
+
+class TestLed(unittest.TestCase):
+    def test_edges(self):
+        cases = {1e9: ' 1.          09', -1e9: '-1.          09', 999999999.9: '999999999.9    ',
+                 1000000001.0: ' 1.000000001 09', 0.01: ' 1.         -02', -0.01: '-1.         -02',
+                 0.0100000001: '0.0100000001   ', 1e-99: ' 1.         -99', 0.0: '0.             ',
+                 123.456: '123.456        ', -0.5: '-0.5           '}
+        for value, led in cases.items():
+            self.assertEqual(hp35bcd.led_string(hp35bcd.from_float(value)), led, repr(value))
+            # The same rules as the float engine
+            self.assertEqual(hp35.format_led(value), led, repr(value))
+
+    def test_range(self):
+        self.assertEqual(hp35bcd.led_string(hp35bcd.HP35_MAX), ' 9.999999999 99')
+        self.assertEqual(hp35bcd.led_string(-hp35bcd.HP35_MAX), '-9.999999999 99')
+        self.assertEqual(hp35bcd.from_float(1e100), hp35bcd.HP35_MAX)
+        self.assertEqual(hp35bcd.from_float(-1e300), -hp35bcd.HP35_MAX)
+        self.assertEqual(hp35bcd.from_float(1e-100), hp35bcd.ZERO)
+        self.assertEqual(hp35bcd.pack(5, -105), hp35bcd.ZERO)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35cache: the LRU dictionary in memory, the sqlite file behind it cut
+# back to 90% of max_rows, the file emptied when the engine or arithmetic
+# version it was stamped with changes, and the hit and miss counts.
+#
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+import hp35cache  # noqa: E402
+
+
+def value(n):
+    return [float(n), 0.0, 0.0, 0.0, 0.0, [], None]
+
+
+class TestMemory(unittest.TestCase):
+    def test_lru(self):
+        cache = hp35cache.ResultCache(maxsize=2)
+        cache.put('a', value(1))
+        cache.put('b', value(2))
+        # 'a' is used, so 'b' is the least recently used and goes first
+        self.assertEqual(cache.get('a'), value(1))
+        cache.put('c', value(3))
+        self.assertEqual(list(cache.memory), ['a', 'c'])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), value(3))
+
+    def test_stats(self):
+        cache = hp35cache.ResultCache()
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', value(1))
+        cache.get('a')
+        cache.get('a')
+        self.assertEqual(dict(cache.stats()), {'hits': 2, 'disk_hits': 0, 'misses': 1, 'evictions': 0, 'memory': 1})
+
+    def test_cache_key(self):
+        self.assertEqual(hp35cache.cache_key(['3', 'e', '+'], [1.0, 0.1]), '3 e +|1.0 0.1')
+
+
+class TestFile(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite')
+
+    def open(self, **options):
+        cache = hp35cache.ResultCache(self.path, **options)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_outlives_the_process(self):
+        cache = self.open()
+        cache.put('a', value(1))
+        cache.close()
+        cache = self.open()
+        self.assertEqual(cache.get('a'), value(1))
+        self.assertEqual(cache.get('a'), value(1))
+        self.assertEqual((cache.hits, cache.disk_hits, cache.misses), (2, 1, 0))
+        self.assertEqual(cache.stats()['disk'], 1)
+
+    def test_evict_to_90_per_cent(self):
+        cache = self.open(maxsize=1, max_rows=100)
+        for n in range(150):
+            cache.put(str(n), value(n))
+        # Use the oldest, so it's kept
+        self.assertEqual(cache.get('0'), value(0))
+        cache.close()
+        cache = self.open()
+        self.assertEqual(cache.rows, 90)
+        self.assertEqual(cache.stats()['disk'], 90)
+        kept = {row[0] for row in cache.db.execute('SELECT key FROM results')}
+        self.assertEqual(kept, {'0'} | {str(n) for n in range(61, 150)})
+
+    def test_evict_on_commit(self):
+        cache = self.open(maxsize=1, max_rows=100)
+        for n in range(hp35cache.COMMIT_EVERY):
+            cache.put(str(n), value(n))
+        self.assertEqual(cache.rows, 90)
+        self.assertEqual(cache.evictions, hp35cache.COMMIT_EVERY - 90)
+
+    def test_version_change_empties(self):
+        cache = self.open()
+        cache.put('a', value(1))
+        cache.close()
+        with mock.patch.object(hp35, 'ARITHMETIC_VERSION', hp35.ARITHMETIC_VERSION + 1):
+            cache = self.open()
+            self.assertEqual(cache.rows, 0)
+            self.assertIsNone(cache.get('a'))
+            cache.put('b', value(2))
+            cache.close()
+            self.assertEqual(self.open().get('b'), value(2))
+
+    def test_engine_change_empties(self):
+        cache = self.open()
+        cache.put('a', value(1))
+        cache.close()
+        cache = self.open(engine=hp35.get_engine('bcd'))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['disk'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
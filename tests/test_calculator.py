@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35.Calculator, the library API: what press() and run() return, errors
+# coming back in the Result rather than raised, 'off' and 'on', 'eex' and
+# the exponent key after it, setting the registers, and the bcd engine.
+# Then undo and redo, through the Calculator and hp35.History itself.
+#
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+import hp35bcd  # noqa: E402
+
+
+class TestCalculator(unittest.TestCase):
+    def test_run(self):
+        calc = hp35.Calculator()
+        self.assertEqual(calc.run('3 e 4 +'), hp35.Result(True, [], None, 7.0, '7.             '))
+        # Keys carry on from the registers left
+        self.assertEqual(calc.press('x').x, 21.0)
+        self.assertEqual(calc.run(['e', '2', '/']).display, '10.5           ')
+
+    def test_winks(self):
+        calc = hp35.Calculator()
+        result = calc.run('1 e 0 / 1x 4 rx')
+        self.assertTrue(result.ok)
+        self.assertEqual(result.winks, [(3, '/'), (4, '1x')])
+        self.assertEqual(result.x, 2.0)
+        self.assertEqual(calc.press('0').winks, [])
+        self.assertEqual(calc.press('ln').winks, [(0, 'ln')])
+
+    def test_errors(self):
+        calc = hp35.Calculator()
+        result = calc.run('2 bogus 3')
+        self.assertEqual((result.ok, result.error, result.x), (False, "Invalid entry 'bogus'", 2.0))
+        self.assertEqual(calc.press('1e999').ok, True)
+        result = calc.press('sin')
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error, 'math domain error')
+        self.assertEqual(calc.run('2 eex x').error, "'eex' needs a one or two digit exponent after it")
+
+    def test_off_and_on(self):
+        calc = hp35.Calculator()
+        # run() stops at 'off'
+        result = calc.run('5 off 6')
+        self.assertEqual((result.ok, result.x, result.display), (True, 5.0, ' ' * 15))
+        self.assertFalse(calc.on)
+        self.assertEqual(calc.press('7').error, 'The calculator is off')
+        self.assertEqual(calc.press('on').display, '5.             ')
+        self.assertEqual(calc.press('7').x, 7.0)
+
+    def test_eex(self):
+        calc = hp35.Calculator()
+        self.assertEqual(calc.press('1.5').x, 1.5)
+        self.assertEqual(calc.press('eex').x, 1.5)
+        self.assertTrue(calc.exponent)
+        result = calc.press('-12')
+        self.assertEqual((result.x, result.display), (1.5e-12, ' 1.5        -12'))
+        self.assertFalse(calc.exponent)
+        self.assertEqual(calc.run('2 eex 3 e 1 +').x, 2001.0)
+
+    def test_registers(self):
+        calc = hp35.Calculator()
+        calc.X = 3
+        calc.Y = '4'
+        self.assertEqual((calc.X, calc.Y), (3.0, 4.0))
+        self.assertEqual(calc.press('+').x, 7.0)
+        self.assertEqual(list(calc.registers().items()), [('X', 7.0), ('Y', 4.0), ('Z', 0.0), ('T', 0.0),
+                                                          ('M', 0.0)])
+        with self.assertRaises(AttributeError):
+            calc.W
+        calc.clear()
+        self.assertEqual(calc.stack.values(), (0.0,) * 5)
+
+    def test_bcd(self):
+        calc = hp35.Calculator('bcd')
+        result = calc.run('2 rx')
+        self.assertIsInstance(result.x, float)
+        self.assertEqual(result.x, 1.414213562)
+        self.assertEqual(result.display, '1.414213562    ')
+        self.assertEqual(calc.X, hp35bcd.Number(1414213562, 0))
+        calc.Y = 0.1
+        self.assertEqual(calc.press('+').x, 1.514213562)
+
+
+class TestHistory(unittest.TestCase):
+    def test_undo_redo(self):
+        calc = hp35.Calculator()
+        calc.run('3 e 4 +')
+        self.assertEqual(calc.press('undo').x, 4.0)
+        self.assertEqual(calc.stack.values(), (4.0, 3.0, 0.0, 0.0, 0.0))
+        self.assertEqual(calc.run('undo undo').x, 3.0)
+        self.assertEqual(calc.run('redo redo redo').x, 7.0)
+        self.assertEqual(calc.press('redo').error, 'Nothing to redo')
+        calc.run('undo undo undo undo')
+        self.assertEqual(calc.stack.values(), (0.0,) * 5)
+        self.assertEqual(calc.press('undo').error, 'Nothing to undo')
+
+    def test_new_key_clears_redo(self):
+        calc = hp35.Calculator()
+        calc.run('3 e 4 + undo')
+        self.assertEqual(calc.press('5').x, 5.0)
+        self.assertEqual(calc.press('redo').error, 'Nothing to redo')
+        self.assertEqual(calc.press('undo').x, 4.0)
+
+    def test_unchanged_not_kept(self):
+        # A key that leaves the registers as they were isn't a step
+        calc = hp35.Calculator()
+        calc.run('0 0 clx')
+        self.assertEqual(len(calc.history), 0)
+        calc.run('2 2')
+        self.assertEqual(len(calc.history), 1)
+
+    def test_setting_a_register(self):
+        calc = hp35.Calculator()
+        calc.X = 5
+        calc.M = 2
+        self.assertEqual(len(calc.history), 2)
+        calc.press('undo')
+        self.assertEqual((calc.X, calc.M), (5.0, 0.0))
+        # Setting a register clears redo, as a key does
+        calc.Y = 1
+        self.assertEqual(calc.press('redo').error, 'Nothing to redo')
+
+    def test_limit(self):
+        calc = hp35.Calculator(history=2)
+        calc.run('1 2 3 4')
+        self.assertEqual(calc.run('undo undo').x, 2.0)
+        self.assertFalse(calc.press('undo').ok)
+
+    def test_no_history(self):
+        calc = hp35.Calculator(history=0)
+        calc.run('3 e 4 +')
+        self.assertEqual(len(calc.history), 0)
+        self.assertEqual(calc.press('undo').error, 'Nothing to undo')
+        self.assertEqual(calc.X, 7.0)
+
+    def test_after_eex_and_off(self):
+        # 'undo' is taken as the exponent, and isn't one; off it's not a key
+        calc = hp35.Calculator()
+        calc.run('2 eex')
+        self.assertFalse(calc.press('undo').ok)
+        calc.run('on 5 off')
+        self.assertEqual(calc.press('undo').error, 'The calculator is off')
+
+    def test_history_alone(self):
+        history = hp35.History(3)
+        stack = hp35.Registers()
+        before = stack.values()
+        stack.X = 1.0
+        history.record(before, stack)
+        self.assertTrue(history.undo(stack))
+        self.assertEqual(stack.X, 0.0)
+        self.assertTrue(history.redo(stack))
+        self.assertEqual(stack.X, 1.0)
+        history.clear()
+        self.assertFalse(history.undo(stack))
+
+
+if __name__ == "__main__":
+    unittest.main()
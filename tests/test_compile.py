@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Compiled programs against hp35.replay_keys() on random keystroke
+# sequences and starting registers, inf and nan among them: the same
+# registers, the same winks, and the same exception where one is raised.
+# A program only winks if can_wink lists a step, and only raises if
+# can_raise does.
+#
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+import hp35compile  # noqa: E402
+import hp35data as hpdata  # noqa: E402
+
+PROGRAMS = 20000
+KEYS = [key for key, spec in hpdata.key_table.items() if spec.handler] + ['pi', 'eex']
+NUMBERS = ['0', '1', '2', '-3', '0.5', '90', '270', '1e300', '-1e300', '1e-5']
+VALUES = [0.0, -0.0, 1.0, -2.5, 90.0, 1e300, -1e300, float('inf'), float('-inf'), float('nan')]
+
+
+def program(generator):
+    tokens = []
+    for n in range(generator.randint(1, 10)):
+        if generator.random() < 0.3:
+            tokens.append(generator.choice(NUMBERS))
+            continue
+        key = generator.choice(KEYS)
+        tokens.append(key)
+        if key == 'eex':
+            tokens.append(str(generator.randint(-99, 99)))
+    return tokens
+
+
+def outcome(function, stack):
+    # repr, so nan compares equal to nan and -0.0 differs from 0.0
+    try:
+        wink = bool(function(stack))
+    except (ArithmeticError, ValueError) as err:
+        return type(err).__name__, str(err)
+    return repr(stack.values()), wink
+
+
+class TestCompile(unittest.TestCase):
+    def test_compiled_matches_replay(self):
+        generator = random.Random(35)
+        for n in range(PROGRAMS):
+            tokens = program(generator)
+            values = [generator.choice(VALUES) for reg in 'XYZTM']
+            compiled = hp35compile.compile_keys(tokens)
+            expected = outcome(lambda stack: hp35.replay_keys(tokens, stack), hp35.Registers(*values))
+            self.assertEqual(outcome(compiled, hp35.Registers(*values)), expected, (tokens, values))
+            if expected[1] is True:
+                self.assertTrue(compiled.can_wink, tokens)
+            elif expected[0].endswith('Error'):
+                self.assertTrue(compiled.can_raise, tokens)
+            if not compiled.can_fail:
+                self.assertIs(expected[1], False, tokens)
+
+    def test_can_fail(self):
+        program = hp35compile.compile_keys('sin')
+        self.assertEqual((program.can_wink, program.can_raise, program.can_fail), ([], [(0, 'sin')], [(0, 'sin')]))
+        program = hp35compile.compile_keys('e x 1x')
+        self.assertEqual(program.can_raise, [])
+        self.assertEqual(program.can_fail, [(1, 'x'), (2, '1x')])
+        # Worked out when the program is compiled
+        self.assertEqual(hp35compile.compile_keys('2 e 3 xy sin').can_fail, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35journal: resuming after a crash, with the last record cut short, with
+# a snapshot only partly written, and with a key in the journal that raises
+# when it's replayed.
+#
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+import hp35journal  # noqa: E402
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'journal')
+
+    def session(self, keys, snapshot_every=256):
+        #
+        # Keys pressed as main() journals them, left open as if the process
+        # died. Returns the registers it got to.
+        #
+        calculator = hp35.Calculator()
+        journal = hp35journal.Journal(self.path, calculator.stack, snapshot_every)
+        self.addCleanup(journal.f.close)
+        for key in keys.split():
+            self.assertTrue(calculator.press(key).ok, key)
+            if key in hp35.dispatch:
+                journal.key(key, calculator.stack)
+            else:
+                journal.number(calculator.stack)
+        return calculator.stack
+
+    def resume(self):
+        return hp35journal.resume(self.path)[0].values()
+
+    def test_no_journal(self):
+        stack, replayed = hp35journal.resume(self.path)
+        self.assertEqual((stack.values(), replayed), ((0.0,) * 5, 0))
+
+    def test_crash(self):
+        stack = self.session('3 e 4 + sto 2 x')
+        registers, replayed = hp35journal.resume(self.path)
+        self.assertEqual(registers.values(), stack.values())
+        self.assertEqual(replayed, 7)
+
+    def test_resume_then_carry_on(self):
+        stack = self.session('2 e 3 +', snapshot_every=2)
+        self.assertEqual(self.resume(), stack.values())
+        calculator = hp35.Calculator()
+        calculator.stack, replayed = hp35journal.resume(self.path)
+        journal = hp35journal.Journal(self.path, calculator.stack)
+        calculator.press('x')
+        journal.key('x', calculator.stack)
+        journal.close(calculator.stack)
+        self.assertEqual(self.resume(), (10.0, 2.0, 0.0, 0.0, 0.0))
+
+    def test_record_cut_short(self):
+        stack = self.session('3 e 4 +')
+        with open(self.path, 'ab') as f:
+            f.write(hp35journal.RECORD.pack(b'K', b'sin', 0.5)[:9])
+        self.assertEqual(self.resume(), stack.values())
+        # Opening it again cuts the part record off
+        hp35journal.open_journal(self.path).close()
+        self.assertEqual(os.path.getsize(self.path) % hp35journal.RECORD.size, 0)
+        self.assertEqual(self.resume(), stack.values())
+
+    def test_partial_snapshot(self):
+        # The last snapshot only got as far as Z: resume from the one before
+        stack = self.session('3 e 4 +')
+        with open(self.path, 'ab') as f:
+            for reg, value in zip('XYZ', (99.0, 98.0, 97.0)):
+                f.write(hp35journal.RECORD.pack(reg.encode(), b'snap', value))
+        self.assertEqual(self.resume(), stack.values())
+
+    def test_key_that_raises(self):
+        # Written by an older version, which journalled keys that failed
+        stack = self.session('2 chs e 0')
+        journal = hp35journal.Journal(self.path, stack)
+        journal.key('xy', stack)
+        journal.number(stack)
+        journal.f.close()
+        registers, replayed = hp35journal.resume(self.path)
+        self.assertEqual(registers.values(), (0.0, -2.0, 0.0, 0.0, 0.0))
+        self.assertEqual(replayed, 1)
+
+    def test_not_a_journal(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * hp35journal.RECORD.size * 6)
+        with self.assertRaises(hp35journal.JournalError):
+            hp35journal.resume(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
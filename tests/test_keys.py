@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# How hp35keys.KeyParser splits typing into keys for --raw: 'e', 'ex' and
+# 'eex', '1x' against '1 x', a minus sign after 'eex', erasing, numbers
+# with more than one point, and typing that arrives in pieces.
+#
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35keys  # noqa: E402
+
+
+def split(*pieces):
+    parser = hp35keys.KeyParser()
+    for piece in pieces:
+        parser.feed(piece)
+    parser.close()
+    return list(parser.tokens)
+
+
+class TestKeyParser(unittest.TestCase):
+    def test_keys_end_when_nothing_longer_can_follow(self):
+        self.assertEqual(split('3 e 4+sin'), ['3', 'e', '4', '+', 'sin'])
+        self.assertEqual(split('12.5+3-'), ['12.5', '+', '3', '-'])
+        self.assertEqual(split('rcl sto clx'), ['rcl', 'sto', 'clx'])
+
+    def test_e_ex_eex(self):
+        self.assertEqual(split('e'), ['e'])
+        self.assertEqual(split('ex'), ['ex'])
+        self.assertEqual(split('e x'), ['e', 'x'])
+        self.assertEqual(split('eex 5'), ['eex', '5'])
+        # 'e' can't end until something that isn't x comes
+        self.assertEqual(split('3e4'), ['3', 'e', '4'])
+        self.assertEqual(split('2 ex+'), ['2', 'ex', '+'])
+
+    def test_reciprocal(self):
+        self.assertEqual(split('1x'), ['1x'])
+        self.assertEqual(split('1 x'), ['1', 'x'])
+        self.assertEqual(split('4 1x'), ['4', '1x'])
+
+    def test_exponent_after_eex(self):
+        self.assertEqual(split('1.5 eex -12'), ['1.5', 'eex', '-12'])
+        self.assertEqual(split('1.5 eex 12-'), ['1.5', 'eex', '12', '-'])
+        # Only right after 'eex': anywhere else a minus sign is a key
+        self.assertEqual(split('5 -12'), ['5', '-', '12'])
+        self.assertEqual(split('2 eex -5 -'), ['2', 'eex', '-5', '-'])
+
+    def test_erase(self):
+        self.assertEqual(split('12\x7f3'), ['13'])
+        self.assertEqual(split('si\b\bcos'), ['cos'])
+        # A key that's finished has gone, and can't be taken back
+        self.assertEqual(split('sin\x7f'), ['sin'])
+        self.assertEqual(split('co\x7f\x7f4'), ['4'])
+        self.assertEqual(split('\x7f5'), ['5'])
+
+    def test_second_point(self):
+        self.assertEqual(split('3.1.4'), ['3.1.4'])
+        self.assertEqual(split('3.1.4+'), ['3.1.4', '+'])
+        self.assertEqual(split('..'), ['..'])
+
+    def test_in_pieces(self):
+        self.assertEqual(split('s', 'i', 'n', '1', '2', ' '), ['sin', '12'])
+        self.assertEqual(split('e', 'e', 'x', ' -', '3'), ['eex', '-3'])
+
+    def test_unknown(self):
+        self.assertEqual(split('2 q'), ['2', 'q'])
+        self.assertEqual(split('si?'), ['si', '?'])
+
+
+if __name__ == "__main__":
+    unittest.main()
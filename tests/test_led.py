@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# format_led() and led_string() against the way show_calc() used to build
+# the LED string: hp35_scientific_notation(), then a sign, rstrip,
+# textwrap.shorten and ljust. Run with 'python3 -m unittest' or pytest from
+# the top of the tree.
+#
+import math
+import os
+import random
+import sys
+import textwrap
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+
+VALUES = 100000
+
+
+def old_led(number):
+    led_display, positive, sci_note = hp35.hp35_scientific_notation(number)
+    if not positive and not sci_note:
+        led_display = '-' + led_display
+    if not sci_note:
+        led_display = led_display.rstrip("0")
+        led_display = textwrap.shorten(led_display, width=15, placeholder='')
+    return led_display.ljust(15, ' ')
+
+
+def numbers(count, seed=35):
+    #
+    # Engine results (rounded to 9 places), raw floats with all their
+    # digits, numbers in scientific notation, below 1e-99 and out of range,
+    # and the edges of each branch
+    #
+    generator = random.Random(seed)
+    yield from [0.0, -0.0, 0.01, -0.01, 1e9, -1e9, 9.99999999e99, -9.99999999e99, 9.999999999e99,
+                -9.999999999e99, 1e100, -1e100, 1e-99, 1e-100, 5e-324, math.pi, 1 / 3, 2 / 3, 123456789.5]
+    for n in range(count):
+        sign = generator.choice([-1.0, 1.0])
+        yield sign * round(generator.uniform(0.0, 1000.0), 9)
+        yield sign * 10.0 ** generator.uniform(-3.0, 9.0)
+        yield sign * 10.0 ** generator.uniform(-99.0, 99.0)
+        yield sign * 10.0 ** generator.uniform(-120.0, -99.0)
+        yield sign * 10.0 ** generator.uniform(99.0, 120.0)
+
+
+class TestLed(unittest.TestCase):
+    def test_format_led(self):
+        for number in numbers(VALUES // 5):
+            self.assertEqual(hp35.format_led(number), old_led(number), repr(number))
+
+    def test_led_string(self):
+        # The cached front end, twice round so the second lot are hits
+        values = list(numbers(2000))
+        for number in values + values:
+            self.assertEqual(hp35.led_string(number), old_led(number), repr(number))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35prof's phases, driven the way main() drives them: one render sample
+# per key however many renderer calls it took, and drawing done while
+# waiting for a key (the prompt in --raw) counted as render, not input.
+#
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35prof  # noqa: E402
+
+DRAW = 0.02
+
+
+class Renderer:
+    def calc(self, *args):
+        time.sleep(DRAW)
+
+    def registers(self, stack):
+        time.sleep(DRAW)
+
+    def menu(self):
+        time.sleep(DRAW)
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = hp35prof.Profiler()
+        self.renderer = hp35prof.ProfiledRenderer(Renderer(), self.profiler)
+
+    def key(self, prompt):
+        # begin(), a prompt drawn while waiting, then compute and draw
+        self.profiler.begin()
+        if prompt:
+            self.renderer.calc('1.', True, False)
+            self.renderer.registers(None)
+            self.renderer.menu()
+        self.profiler.input_done()
+        self.profiler.compute_done('+', False)
+        self.renderer.calc('1.', True, False)
+        self.renderer.registers(None)
+
+    def test_one_render_sample_per_key(self):
+        # Drawn before the first key, and not counted
+        self.renderer.calc('0.', True, False)
+        for n in range(3):
+            self.key(False)
+        phases = self.profiler.summary()['phases']
+        self.assertEqual(phases['render']['count'], 3)
+        self.assertEqual(phases['compute']['count'], 3)
+        self.assertGreaterEqual(phases['render']['mean_us'], 2 * DRAW * 1e6)
+
+    def test_prompt_is_render_time(self):
+        for n in range(3):
+            self.key(True)
+        phases = self.profiler.summary()['phases']
+        self.assertEqual(phases['render']['count'], 3)
+        self.assertLess(phases['input']['max_us'], DRAW * 1e6)
+        # The prompt is drawn for the key before, so the first key gets it
+        # as well as its own frame
+        self.assertGreaterEqual(phases['render']['max_us'], 5 * DRAW * 1e6)
+
+    def test_summary_twice(self):
+        self.key(False)
+        self.profiler.summary()
+        self.assertEqual(self.profiler.summary()['phases']['render']['count'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35serve over a localhost socket: replies, winks and errors, 'off', a
+# line that's too long and the limit on sessions.
+#
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35serve  # noqa: E402
+
+
+class TestServe(unittest.IsolatedAsyncioTestCase):
+    async def start(self, **options):
+        self.server = hp35serve.Server(**options)
+        self.listener = await self.server.start('127.0.0.1:0')
+        self.port = self.listener.sockets[0].getsockname()[1]
+        self.addCleanup(self.stop)
+
+    async def stop(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        self.addCleanup(writer.close)
+        return reader, writer
+
+    async def ask(self, reader, writer, line):
+        writer.write(line.encode() + b'\n')
+        await writer.drain()
+        return (await asyncio.wait_for(reader.readline(), 5.0)).decode().rstrip('\n')
+
+    async def test_replies(self):
+        await self.start()
+        reader, writer = await self.connect()
+        self.assertEqual(await self.ask(reader, writer, '3 e 4 +'), '7.')
+        # The registers carry over from line to line
+        self.assertEqual(await self.ask(reader, writer, 'x'), '21.')
+        self.assertEqual(await self.ask(reader, writer, '0 1x'), 'wink 0.')
+        self.assertEqual(await self.ask(reader, writer, '2 bogus'), "error Invalid entry 'bogus'")
+        self.assertEqual(await self.ask(reader, writer, '1.5 eex -12'), ' 1.5        -12')
+
+    async def test_reply_x(self):
+        await self.start(reply='x')
+        reader, writer = await self.connect()
+        self.assertEqual(await self.ask(reader, writer, '2 rx'), '1.414213562')
+
+    async def test_sessions_are_separate(self):
+        await self.start()
+        first = await self.connect()
+        second = await self.connect()
+        self.assertEqual(await self.ask(*first, '5 sto'), '5.')
+        self.assertEqual(await self.ask(*second, 'rcl'), '0.')
+
+    async def test_off(self):
+        await self.start()
+        reader, writer = await self.connect()
+        self.assertEqual(await self.ask(reader, writer, '9 off'), '9.')
+        self.assertEqual(await asyncio.wait_for(reader.read(), 5.0), b'')
+
+    async def test_line_too_long(self):
+        await self.start()
+        reader, writer = await self.connect()
+        self.assertEqual(await self.ask(reader, writer, '1 ' * hp35serve.MAX_LINE), 'error line too long')
+        self.assertEqual(await asyncio.wait_for(reader.read(), 5.0), b'')
+
+    async def test_max_sessions(self):
+        await self.start(max_sessions=1)
+        reader, writer = await self.connect()
+        self.assertEqual(await self.ask(reader, writer, '1'), '1.')
+        refused, _ = await self.connect()
+        self.assertEqual(await asyncio.wait_for(refused.read(), 5.0), b'error too many sessions\n')
+        # The first session carries on, and once it's gone there's room again
+        self.assertEqual(await self.ask(reader, writer, '2'), '2.')
+        self.assertEqual(await self.ask(reader, writer, 'off'), '2.')
+        await asyncio.wait_for(reader.read(), 5.0)
+        reader, writer = await self.connect()
+        self.assertEqual(await self.ask(reader, writer, '3'), '3.')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# hp35solve: each method on both engines finds the root to the 10 digits
+# shown, and only says it converged when it did. The secant method can stop
+# somewhere flat that isn't a root, and can stall at a root when f comes
+# out the same either side of it; neither may be reported the wrong way.
+#
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hp35  # noqa: E402
+import hp35solve  # noqa: E402
+
+# keys, bracket, the root to 10 digits
+PROBLEMS = [('e x e 2 -', (0.0, 10.0), 1.414213562),
+            ('ex e 1000 -', (0.0, 10.0), 6.907755279),
+            ('sin', (100.0, 200.0), 180.0),
+            ('e e x x e 30 -', (0.0, 5.0), 3.107232506),
+            ('chs e 1 -', (-3.0, 4.0), -1.0)]
+
+
+class TestSolve(unittest.TestCase):
+    def test_methods(self):
+        for engine in ('float', 'bcd'):
+            for method in hp35solve.METHODS:
+                for keys, (a, b), root in PROBLEMS:
+                    if method == 'secant' and keys.startswith('ex'):
+                        continue
+                    solution = hp35solve.solve(keys, a, b, method, hp35.get_engine(engine))
+                    self.assertTrue(solution.converged, (engine, method, keys, solution))
+                    self.assertEqual(solution.root, root, (engine, method, keys, solution))
+                    self.assertEqual(solution.method, method)
+                    self.assertGreater(solution.evaluations, 0)
+
+    def test_secant_flat_is_not_a_root(self):
+        # It stops where ex is flat, far from the root
+        for engine in ('float', 'bcd'):
+            solution = hp35solve.solve('ex e 1000 -', 0.0, 10.0, 'secant', hp35.get_engine(engine))
+            self.assertFalse(solution.converged, (engine, solution))
+            self.assertLess(solution.value, -900.0)
+        # Flat with no root at all
+        self.assertFalse(hp35solve.solve('e x e 1 +', -1.0, 1.0, 'secant').converged)
+
+    def test_secant_stalled_at_a_root(self):
+        # Under bcd f(X) comes out the same at the last two steps, at the root
+        solution = hp35solve.solve('e x e 2 -', 0.0, 10.0, 'secant', hp35.get_engine('bcd'))
+        self.assertTrue(solution.converged, solution)
+        self.assertEqual(solution.root, 1.414213562)
+
+    def test_settled(self):
+        f = hp35solve.Function('e x e 2 -')
+        self.assertTrue(hp35solve.settled(f, 1.414213562, f(1.414213562)))
+        self.assertTrue(hp35solve.settled(f, 1.414213563, f(1.414213563)))
+        self.assertFalse(hp35solve.settled(f, 1.414213, f(1.414213)))
+
+    def test_bracket(self):
+        for method in ('brent', 'bisect'):
+            with self.assertRaises(ValueError):
+                hp35solve.solve('e x e 2 -', 2.0, 3.0, method)
+            # A root at an end
+            solution = hp35solve.solve('e 2 -', 2.0, 3.0, method)
+            self.assertEqual((solution.root, solution.value, solution.converged), (2.0, 0.0, True))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            hp35solve.solve('e x e 2 -', 0.0, 1.0, 'newton')
+        with self.assertRaises(ValueError):
+            hp35solve.solve('bogus', 0.0, 1.0)
+        # ln winks at 0
+        with self.assertRaises(ValueError):
+            hp35solve.solve('ln', 0.0, 2.0, 'bisect')
+
+    def test_report(self):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            status = hp35solve.report('ex e 1000 -', 0.0, 10.0, hp35solve.METHODS)
+        self.assertEqual(status, 1)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], hp35solve.METHODS)
+        self.assertEqual([line.endswith('did not converge') for line in lines], [False, False, True])
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            self.assertEqual(hp35solve.report('e x e 2 -', 0.0, 10.0, hp35solve.METHODS), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()